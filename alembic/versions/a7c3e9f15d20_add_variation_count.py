@@ -0,0 +1,33 @@
+"""add_variation_count
+
+Revision ID: a7c3e9f15d20
+Revises: e2a9c7f41b58
+Create Date: 2026-10-16
+
+Stores the number of answer variations next to the encoded list so the
+admin cache listing can report it without decoding every row.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a7c3e9f15d20"
+down_revision = "e2a9c7f41b58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "cached_answers",
+        sa.Column("variation_count", sa.Integer(), server_default="1", nullable=False),
+    )
+    # variations holds the encoded list as a JSON string, so unwrap it first.
+    op.execute(
+        "UPDATE cached_answers "
+        "SET variation_count = json_array_length((variations #>> '{}')::json)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("cached_answers", "variation_count")
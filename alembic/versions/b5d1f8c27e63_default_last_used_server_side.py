@@ -0,0 +1,37 @@
+"""default_last_used_server_side
+
+Revision ID: b5d1f8c27e63
+Revises: a7c3e9f15d20
+Create Date: 2026-10-16
+
+Lets Postgres stamp cached_answers.last_used (in UTC, matching the naive
+UTC timestamps the application writes elsewhere).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "b5d1f8c27e63"
+down_revision = "a7c3e9f15d20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "cached_answers",
+        "last_used",
+        server_default=sa.text("timezone('utc', now())"),
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "cached_answers",
+        "last_used",
+        server_default=None,
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+    )
@@ -0,0 +1,32 @@
+"""add_question_trigram_index
+
+Revision ID: c4e7a1d92f03
+Revises: 612cc1581ccc
+Create Date: 2026-10-16
+
+Enables pg_trgm and adds a GIN trigram index on cached_answers.question so
+the admin search (question ILIKE '%q%') can use an index instead of a
+sequential scan.
+"""
+
+from alembic import op
+
+revision = "c4e7a1d92f03"
+down_revision = "612cc1581ccc"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_cached_answers_question_trgm",
+        "cached_answers",
+        ["question"],
+        postgresql_using="gin",
+        postgresql_ops={"question": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cached_answers_question_trgm", table_name="cached_answers")
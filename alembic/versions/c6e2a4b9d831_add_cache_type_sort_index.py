@@ -0,0 +1,39 @@
+"""add_cache_type_sort_index
+
+Revision ID: c6e2a4b9d831
+Revises: b5d1f8c27e63
+Create Date: 2026-10-16
+
+Covers the last admin cache listing sort key (cache_type) with the same
+(col DESC NULLS LAST, id DESC) shape as the others. Built concurrently so
+cache reads and writes are not blocked while it builds.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c6e2a4b9d831"
+down_revision = "b5d1f8c27e63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_cached_answers_cache_type_id_desc",
+            "cached_answers",
+            [sa.text("cache_type DESC NULLS LAST"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_cached_answers_cache_type_id_desc",
+            table_name="cached_answers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
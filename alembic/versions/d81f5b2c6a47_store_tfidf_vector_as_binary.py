@@ -0,0 +1,58 @@
+"""store_tfidf_vector_as_binary
+
+Revision ID: d81f5b2c6a47
+Revises: c4e7a1d92f03
+Create Date: 2026-10-16
+
+Converts cached_answers.tfidf_vector from a JSON-encoded list of floats
+(TEXT) to raw float16 bytes (BYTEA), roughly 4-8x smaller on the wire.
+"""
+
+import json
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+revision = "d81f5b2c6a47"
+down_revision = "c4e7a1d92f03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cached_answers", sa.Column("tfidf_vector_bin", sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, tfidf_vector FROM cached_answers")).fetchall()
+
+    for cache_id, vector_json in rows:
+        vector_bytes = np.asarray(json.loads(vector_json), dtype=np.float16).tobytes()
+        connection.execute(
+            sa.text("UPDATE cached_answers SET tfidf_vector_bin = :v WHERE id = :id"),
+            {"v": vector_bytes, "id": cache_id},
+        )
+
+    op.drop_column("cached_answers", "tfidf_vector")
+    op.alter_column(
+        "cached_answers", "tfidf_vector_bin", new_column_name="tfidf_vector", nullable=False
+    )
+
+
+def downgrade() -> None:
+    op.add_column("cached_answers", sa.Column("tfidf_vector_text", sa.Text(), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, tfidf_vector FROM cached_answers")).fetchall()
+
+    for cache_id, vector_bytes in rows:
+        vector = np.frombuffer(vector_bytes, dtype=np.float16).astype(float).tolist()
+        connection.execute(
+            sa.text("UPDATE cached_answers SET tfidf_vector_text = :v WHERE id = :id"),
+            {"v": json.dumps(vector), "id": cache_id},
+        )
+
+    op.drop_column("cached_answers", "tfidf_vector")
+    op.alter_column(
+        "cached_answers", "tfidf_vector_text", new_column_name="tfidf_vector", nullable=False
+    )
@@ -0,0 +1,67 @@
+"""add_listing_keyset_indexes
+
+Revision ID: e2a9c7f41b58
+Revises: d81f5b2c6a47
+Create Date: 2026-10-16
+
+Adds (col DESC NULLS LAST, id DESC) btree indexes matching the admin cache
+and session listings' ORDER BY, so an offset or cursor page reads at most
+`limit` rows from the index instead of sorting the whole table. Replaces the
+plain last_used DESC index, which sorts NULLs first and does not match.
+Built concurrently so reads and writes are not blocked while they build.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e2a9c7f41b58"
+down_revision = "d81f5b2c6a47"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("cached_answers", "last_used"),
+    ("cached_answers", "created_at"),
+    ("cached_answers", "hit_count"),
+    ("cached_answers", "expires_at"),
+    ("session", "created_at"),
+    ("session", "last_activity"),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(
+                f"ix_{table}_{column}_id_desc",
+                table,
+                [sa.text(f"{column} DESC NULLS LAST"), sa.text("id DESC")],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+        op.drop_index(
+            "ix_cached_answers_last_used",
+            table_name="cached_answers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_cached_answers_last_used",
+            "cached_answers",
+            [sa.literal_column("last_used DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+        for table, column in INDEXES:
+            op.drop_index(
+                f"ix_{table}_{column}_id_desc",
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
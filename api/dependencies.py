@@ -1,3 +1,5 @@
+import asyncio
+import logging
 from collections.abc import AsyncGenerator
 from functools import lru_cache
 
@@ -7,9 +9,11 @@ from config import Config
 from core.chat import Chat
 from core.llm import create_llm_provider
 from core.persona import Persona
+from repositories.cache_hit_buffer import cache_hit_buffer
 from repositories.cache_repo import SQLAlchemyCacheRepository
 from repositories.connection import get_session
 from repositories.conversation_repo import SQLAlchemyConversationRepository
+from repositories.conversation_writer import conversation_writer
 from services.cache_service import CacheService
 from services.conversation_logger import ConversationLogger
 from services.push_over import PushOver
@@ -17,6 +21,9 @@ from services.similarity_service import SimilarityService
 from tools.llm_tools import Tools
 
 
+logger = logging.getLogger(__name__)
+
+
 @lru_cache
 def get_config() -> Config:
     return Config.from_env()
@@ -26,6 +33,10 @@ def get_persona() -> Persona:
     config = get_config()
     return Persona(config.persona_name, config.persona_file)
 
+@lru_cache
+def get_similarity_service() -> SimilarityService:
+    return SimilarityService(threshold=0.80)
+
 @lru_cache
 def get_chat_service() -> Chat:
     config = get_config()
@@ -60,9 +71,13 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def get_conversation_logger(session: AsyncSession) -> ConversationLogger:
-    conversation_repo = SQLAlchemyConversationRepository(session)
-    cache_repo = SQLAlchemyCacheRepository(session)
-    similarity_service = SimilarityService(threshold=0.80)
+    config = get_config()
+    writer = conversation_writer if config.conversation_write_window > 0 else None
+    conversation_repo = SQLAlchemyConversationRepository(session, writer=writer)
+    # Without a flusher, buffered hits would pile up in memory and never reach the DB.
+    hit_buffer = cache_hit_buffer if cache_hit_buffer.running else None
+    cache_repo = SQLAlchemyCacheRepository(session, hit_buffer=hit_buffer)
+    similarity_service = get_similarity_service()
     persona_hash = get_persona().content_hash()
     cache_service = CacheService(cache_repo, similarity_service, persona_hash)
 
@@ -71,6 +86,15 @@ async def get_conversation_logger(session: AsyncSession) -> ConversationLogger:
     )
 
 
+async def warm_similarity_service() -> None:
+    # Building the service imports sklearn, which takes over a second; do it in a
+    # thread so neither startup nor the first cached request blocks the event loop.
+    try:
+        await asyncio.to_thread(get_similarity_service)
+    except Exception:
+        logger.warning("Could not build the similarity service", exc_info=True)
+
+
 def is_database_configured() -> bool:
     config = get_config()
     return config.database_url is not None
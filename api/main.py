@@ -1,13 +1,17 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
-from api.dependencies import get_config
+from api.dependencies import get_config, is_database_configured, warm_similarity_service
 from api.middleware.cors import setup_cors
 from api.middleware.rate_limit_state import rate_limit_state
 from api.routes import admin, chat, health
+from repositories.cache_hit_buffer import cache_hit_buffer
+from repositories.cache_sweeper import sweep_expired_cache
 from repositories.connection import close_database
+from repositories.conversation_writer import conversation_writer
 
 
 @asynccontextmanager
@@ -16,7 +20,28 @@ async def lifespan(app: FastAPI):
     rate_limit_state.update_settings(
         enabled=config.rate_limit_enabled, rate_per_hour=config.rate_limit_per_hour
     )
+
+    background_tasks: list[asyncio.Task] = []
+    if is_database_configured():
+        background_tasks.append(asyncio.create_task(warm_similarity_service()))
+    if is_database_configured() and config.cache_hit_flush_interval > 0:
+        background_tasks.append(
+            asyncio.create_task(cache_hit_buffer.run(config, config.cache_hit_flush_interval))
+        )
+    if is_database_configured() and config.conversation_write_window > 0:
+        conversation_writer.window = config.conversation_write_window
+        background_tasks.append(asyncio.create_task(conversation_writer.run(config)))
+    if is_database_configured() and config.cache_sweep_interval > 0:
+        background_tasks.append(
+            asyncio.create_task(sweep_expired_cache(config, config.cache_sweep_interval))
+        )
+
     yield
+
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await close_database()
 
 
@@ -73,10 +73,11 @@ class SessionSummary(BaseModel):
 
 class SessionListResponse(BaseModel):
     sessions: list[SessionSummary]
-    total: int
-    page: int
+    total: int | None
+    page: int | None
     limit: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
 
 
 class CacheEntry(BaseModel):
@@ -84,8 +85,9 @@ class CacheEntry(BaseModel):
     cache_key: str | None = None
     question: str
     context_preview: str | None = None
-    variations: list[str]
+    variations: list[str] | None = None
     variation_index: int
+    variation_count: int
     cache_type: str = "knowledge"
     expires_at: datetime | None = None
     hit_count: int
@@ -98,7 +100,6 @@ class CacheEntryDetail(BaseModel):
     cache_key: str | None = None
     question: str
     context_preview: str | None = None
-    tfidf_vector: str | None
     variations: list[str]
     variation_index: int
     cache_type: str = "knowledge"
@@ -110,10 +111,11 @@ class CacheEntryDetail(BaseModel):
 
 class CacheListResponse(BaseModel):
     entries: list[CacheEntry]
-    total: int
-    page: int
+    total: int | None
+    page: int | None
     limit: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
 
 
 class CacheSearchResult(BaseModel):
@@ -243,6 +245,13 @@ async def get_cache_stats(session: AsyncSession = Depends(get_db_session)):
     "/cache", response_model=ClearCacheResponse, dependencies=[Depends(require_database)]
 )
 async def clear_cache(session: AsyncSession = Depends(get_db_session)):
+    """Empty the answer cache with TRUNCATE.
+
+    TRUNCATE takes an ACCESS EXCLUSIVE lock, so cache reads and the hit-counter
+    flush wait until it commits. Hit counts buffered for removed entries update
+    no rows and are dropped. Ids keep counting from where they were; the
+    sequence is not restarted.
+    """
     logger = await get_conversation_logger(session)
     deleted = await logger.clear_cache()
     return ClearCacheResponse(success=True, deleted_count=deleted)
@@ -279,10 +288,16 @@ async def list_sessions(
     limit: int = Query(20, ge=1, le=100),
     sort_by: SessionSortBy = Query(SessionSortBy.created_at),
     order: SortOrder = Query(SortOrder.desc),
+    cursor: str | None = Query(None),
     session: AsyncSession = Depends(get_db_session),
 ):
     logger = await get_conversation_logger(session)
-    result = await logger.list_sessions(page, limit, sort_by.value, order.value)
+    try:
+        result = await logger.list_sessions(page, limit, sort_by.value, order.value, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+        ) from None
 
     return SessionListResponse(
         sessions=[SessionSummary(**s) for s in result["sessions"]],
@@ -290,6 +305,7 @@ async def list_sessions(
         page=result["page"],
         limit=result["limit"],
         total_pages=result["total_pages"],
+        next_cursor=result["next_cursor"],
     )
 
 
@@ -314,6 +330,13 @@ async def delete_session(session_id: str, session: AsyncSession = Depends(get_db
     "/sessions", response_model=ClearSessionsResponse, dependencies=[Depends(require_database)]
 )
 async def clear_all_sessions(session: AsyncSession = Depends(get_db_session)):
+    """Delete every session and conversation with TRUNCATE.
+
+    TRUNCATE takes an ACCESS EXCLUSIVE lock on both tables, so chat turns and the
+    batched conversation writer wait until it commits. A turn whose session was
+    removed fails its conversation insert with a foreign-key error. Ids keep
+    counting from where they were; the sequences are not restarted.
+    """
     logger = await get_conversation_logger(session)
     deleted = await logger.clear_all_sessions()
     return ClearSessionsResponse(success=True, deleted_count=deleted)
@@ -327,10 +350,19 @@ async def list_cache_entries(
     limit: int = Query(20, ge=1, le=100),
     sort_by: CacheSortBy = Query(CacheSortBy.last_used),
     order: SortOrder = Query(SortOrder.desc),
+    cursor: str | None = Query(None),
+    include_variations: bool = Query(False),
     session: AsyncSession = Depends(get_db_session),
 ):
     logger = await get_conversation_logger(session)
-    result = await logger.list_cache_entries(page, limit, sort_by.value, order.value)
+    try:
+        result = await logger.list_cache_entries(
+            page, limit, sort_by.value, order.value, cursor, include_variations
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+        ) from None
 
     return CacheListResponse(
         entries=[CacheEntry(**e) for e in result["entries"]],
@@ -338,6 +370,7 @@ async def list_cache_entries(
         page=result["page"],
         limit=result["limit"],
         total_pages=result["total_pages"],
+        next_cursor=result["next_cursor"],
     )
 
 
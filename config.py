@@ -21,7 +21,12 @@ class Config:
     database_url: str | None = None
     db_pool_size: int = 10
     db_max_overflow: int = 10
+    db_pool_recycle: int = 3600
+    db_statement_cache_size: int = 1024
     db_echo: bool = False
+    cache_hit_flush_interval: float = 1.0
+    cache_sweep_interval: float = 60.0
+    conversation_write_window: float = 0.01
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -44,7 +49,12 @@ class Config:
         database_url = os.getenv("POSTGRES_URL") or os.getenv("DATABASE_URL")
         db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
         db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+        db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+        db_statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
         db_echo = os.getenv("DB_ECHO", "false").lower() == "true"
+        cache_hit_flush_interval = float(os.getenv("CACHE_HIT_FLUSH_INTERVAL", "1.0"))
+        cache_sweep_interval = float(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+        conversation_write_window = float(os.getenv("CONVERSATION_WRITE_WINDOW", "0.01"))
 
         return cls(
             llm_provider=llm_provider,
@@ -62,5 +72,10 @@ class Config:
             database_url=database_url,
             db_pool_size=db_pool_size,
             db_max_overflow=db_max_overflow,
+            db_pool_recycle=db_pool_recycle,
+            db_statement_cache_size=db_statement_cache_size,
             db_echo=db_echo,
+            cache_hit_flush_interval=cache_hit_flush_interval,
+            cache_sweep_interval=cache_sweep_interval,
+            conversation_write_window=conversation_write_window,
         )
@@ -45,7 +45,7 @@ class ConversationRepository(Protocol):
 class CacheRepository(Protocol):
     async def get_cache_by_question(self, question: str) -> dict | None: ...
 
-    async def create_cache(self, question: str, tfidf_vector: str, answer: str) -> int: ...
+    async def create_cache(self, question: str, tfidf_vector: bytes, answer: str) -> int: ...
 
     async def add_variation(self, cache_id: int, answer: str) -> None: ...
 
@@ -1,6 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -23,6 +33,11 @@ class Session(Base):
         back_populates="session", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_session_created_at_id_desc", created_at.desc().nulls_last(), id.desc()),
+        Index("ix_session_last_activity_id_desc", last_activity.desc().nulls_last(), id.desc()),
+    )
+
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -51,19 +66,33 @@ class CachedAnswer(Base):
     cache_key: Mapped[str] = mapped_column(String(64), unique=True, index=True, nullable=False)
     question: Mapped[str] = mapped_column(Text, nullable=False, index=True)
     context_preview: Mapped[str | None] = mapped_column(String(200), nullable=True)
-    tfidf_vector: Mapped[str] = mapped_column(Text, nullable=False)
+    tfidf_vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
     variations: Mapped[str] = mapped_column(JSON, nullable=False)
     variation_index: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    variation_count: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1", nullable=False
+    )
     cache_type: Mapped[str] = mapped_column(String(20), default="knowledge", nullable=False)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
-    last_used: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.timezone("utc", func.now()), nullable=False
+    )
     hit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
     __table_args__ = (
-        Index("ix_cached_answers_last_used", last_used.desc()),
-        Index("ix_cached_answers_expires_at", expires_at),
+        Index("ix_cached_answers_last_used_id_desc", last_used.desc().nulls_last(), id.desc()),
+        Index("ix_cached_answers_created_at_id_desc", created_at.desc().nulls_last(), id.desc()),
+        Index("ix_cached_answers_hit_count_id_desc", hit_count.desc().nulls_last(), id.desc()),
+        Index("ix_cached_answers_expires_at_id_desc", expires_at.desc().nulls_last(), id.desc()),
+        Index("ix_cached_answers_cache_type_id_desc", cache_type.desc().nulls_last(), id.desc()),
         Index("ix_cached_answers_cache_type", cache_type),
+        Index(
+            "ix_cached_answers_question_trgm",
+            question,
+            postgresql_using="gin",
+            postgresql_ops={"question": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from models.models import CachedAnswer
+
+from .connection import get_session
+
+
+logger = logging.getLogger(__name__)
+
+# core_only keeps the parameter list a plain executemany; the ORM bulk-by-primary-key
+# path would reject the WHERE clause.
+_FLUSH_STATEMENT = (
+    update(CachedAnswer)
+    .where(CachedAnswer.id == bindparam("b_id"))
+    .values(
+        hit_count=CachedAnswer.hit_count + bindparam("b_hits"),
+        last_used=func.greatest(CachedAnswer.last_used, bindparam("b_used")),
+    )
+    .execution_options(dml_strategy="core_only")
+)
+
+
+class CacheHitBuffer:
+    """Coalesces cache-hit counter updates and writes them out in batches."""
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._pending: dict[int, tuple[int, datetime]] = {}
+        self._full = asyncio.Event()
+        self.running = False
+
+    def record(self, cache_id: int, used_at: datetime) -> None:
+        hits, last_used = self._pending.get(cache_id, (0, used_at))
+        self._pending[cache_id] = (hits + 1, max(last_used, used_at))
+
+        if len(self._pending) >= self.max_pending:
+            self._full.set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def flush(self, session: AsyncSession) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        self._full.clear()
+
+        try:
+            await session.execute(
+                _FLUSH_STATEMENT,
+                [
+                    {"b_id": cache_id, "b_hits": hits, "b_used": used_at}
+                    for cache_id, (hits, used_at) in pending.items()
+                ],
+            )
+            await session.commit()
+        except BaseException:
+            self._restore(pending)
+            raise
+        return len(pending)
+
+    def _restore(self, pending: dict[int, tuple[int, datetime]]) -> None:
+        # Fold the unwritten counts back in with any hits recorded meanwhile. The next
+        # interval retries them; signalling full here would spin while the DB is down.
+        for cache_id, (hits, used_at) in pending.items():
+            newer_hits, newer_used = self._pending.get(cache_id, (0, used_at))
+            self._pending[cache_id] = (hits + newer_hits, max(used_at, newer_used))
+
+    async def run(self, config: Config, interval: float) -> None:
+        # Events bind to the loop that first waits on them; start fresh on this one.
+        self._full = asyncio.Event()
+        if len(self._pending) >= self.max_pending:
+            self._full.set()
+        self.running = True
+        try:
+            while True:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._full.wait(), timeout=interval)
+                await self._flush_with_session(config)
+        finally:
+            self.running = False
+            await self._flush_with_session(config)
+
+    async def _flush_with_session(self, config: Config) -> None:
+        if not self._pending:
+            return
+
+        try:
+            async with get_session(config) as session:
+                await self.flush(session)
+        except Exception:
+            logger.exception("Failed to flush cache hit counters")
+
+
+cache_hit_buffer = CacheHitBuffer()
@@ -1,234 +1,432 @@
-import json
+from collections.abc import Callable
 from datetime import datetime
-from typing import cast
-
-from sqlalchemy import CursorResult, delete, desc, func, select
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Any, cast
+
+import orjson
+from sqlalchemy import (
+    CursorResult,
+    bindparam,
+    case,
+    delete,
+    desc,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.models import CachedAnswer
 
+from .cache_hit_buffer import CacheHitBuffer
+from .pagination import decode_cursor, encode_cursor, order_by_keyset, seek_after, total_counts
+from .ttl_cache import TTLCache
+
+
+_loads = orjson.loads
+
+
+def _dumps(value: list[str]) -> str:
+    return orjson.dumps(value).decode()
+
+
+_SIMILARITY_COLUMNS = (
+    CachedAnswer.id,
+    CachedAnswer.cache_key,
+    CachedAnswer.question,
+    CachedAnswer.tfidf_vector,
+    CachedAnswer.variations,
+    CachedAnswer.variation_index,
+    CachedAnswer.cache_type,
+    CachedAnswer.expires_at,
+)
+
+_ENTRY_COLUMNS = (
+    CachedAnswer.id,
+    CachedAnswer.cache_key,
+    CachedAnswer.question,
+    CachedAnswer.context_preview,
+    CachedAnswer.variations,
+    CachedAnswer.variation_index,
+    CachedAnswer.cache_type,
+    CachedAnswer.expires_at,
+    CachedAnswer.hit_count,
+    CachedAnswer.created_at,
+    CachedAnswer.last_used,
+)
+
+_LIST_COLUMNS = (
+    CachedAnswer.id,
+    CachedAnswer.cache_key,
+    CachedAnswer.question,
+    CachedAnswer.context_preview,
+    CachedAnswer.variation_index,
+    CachedAnswer.variation_count,
+    CachedAnswer.cache_type,
+    CachedAnswer.expires_at,
+    CachedAnswer.hit_count,
+    CachedAnswer.created_at,
+    CachedAnswer.last_used,
+)
+
+_LIST_WITH_VARIATIONS_COLUMNS = (*_LIST_COLUMNS, CachedAnswer.variations)
+
+_SEARCH_COLUMNS = (
+    CachedAnswer.id,
+    CachedAnswer.cache_key,
+    CachedAnswer.question,
+    CachedAnswer.context_preview,
+    CachedAnswer.cache_type,
+    CachedAnswer.expires_at,
+    CachedAnswer.hit_count,
+    CachedAnswer.last_used,
+)
+
+_SORT_COLUMNS = MappingProxyType(
+    {
+        "hit_count": CachedAnswer.hit_count,
+        "created_at": CachedAnswer.created_at,
+        "last_used": CachedAnswer.last_used,
+        "expires_at": CachedAnswer.expires_at,
+        "cache_type": CachedAnswer.cache_type,
+    }
+)
+
+# The hottest lookup skips statement compilation entirely. Columns follow
+# _ENTRY_COLUMNS; variations is stored as a JSON string, so unwrap it here.
+_SELECT_BY_KEY_SQL = (
+    "SELECT id, cache_key, question, context_preview, variations #>> '{}' AS variations, "
+    "variation_index, cache_type, expires_at, hit_count, created_at, last_used "
+    "FROM cached_answers "
+    "WHERE cache_key = $1 AND (expires_at IS NULL OR expires_at > $2) "
+    "LIMIT 1"
+)
+_SELECT_BY_QUESTION = select(*_ENTRY_COLUMNS).where(CachedAnswer.question == bindparam("question"))
+_SELECT_ENTRY_BY_ID = select(*_ENTRY_COLUMNS).where(CachedAnswer.id == bindparam("cache_id"))
+_SELECT_BY_ID = select(CachedAnswer).where(CachedAnswer.id == bindparam("cache_id"))
+
+_TABLE = CachedAnswer.__tablename__
+
+# variation_index wraps on the stored count, so rotation needs no JSON work in SQL.
+# RETURNING yields the post-update index; the served answer is the one before it.
+# No ORM objects are loaded for these rows, so skip session synchronization.
+_ROTATE_VARIATION = (
+    update(CachedAnswer)
+    .where(CachedAnswer.id == bindparam("cache_id"))
+    .values(variation_index=(CachedAnswer.variation_index + 1) % CachedAnswer.variation_count)
+    .returning(CachedAnswer.variations, CachedAnswer.variation_index)
+    .execution_options(synchronize_session=False)
+)
+_ROTATE_VARIATION_AND_COUNT_HIT = _ROTATE_VARIATION.values(
+    hit_count=CachedAnswer.hit_count + 1,
+    last_used=func.timezone("utc", func.now()),
+)
+
+_TRUNCATE = text(f"TRUNCATE TABLE {_TABLE}")
+
+_STATS = select(
+    func.count().label("total_questions"),
+    func.coalesce(func.sum(CachedAnswer.variation_count), 0).label("total_variations"),
+    func.count().filter(CachedAnswer.cache_type == "knowledge").label("knowledge_entries"),
+    func.count()
+    .filter(CachedAnswer.cache_type == "conversational")
+    .label("conversational_entries"),
+    func.count()
+    .filter(CachedAnswer.expires_at < func.timezone("utc", func.now()))
+    .label("expired_entries"),
+)
+
+# Columns an upsert replaces when the conflicting row has already expired. Key lookups
+# hide expired rows, so a write for such a key must start the entry over.
+_REFRESHED_ON_EXPIRY = (
+    "context_preview",
+    "tfidf_vector",
+    "variations",
+    "variation_index",
+    "variation_count",
+    "cache_type",
+    "expires_at",
+    "hit_count",
+    "created_at",
+)
+
+# Built once so every create_cache call hits the same compiled-cache entry; the
+# per-entry values are bound at execute time.
+_INSERT_CACHE = insert(CachedAnswer).values(variation_index=0, variation_count=1, hit_count=0)
+_UPSERT_CACHE = _INSERT_CACHE.on_conflict_do_update(
+    index_elements=[CachedAnswer.cache_key],
+    set_={
+        "last_used": _INSERT_CACHE.excluded.last_used,
+        **{
+            name: case(
+                (
+                    CachedAnswer.expires_at < func.timezone("utc", func.now()),
+                    _INSERT_CACHE.excluded[name],
+                ),
+                else_=getattr(CachedAnswer, name),
+            )
+            for name in _REFRESHED_ON_EXPIRY
+        },
+    },
+).returning(CachedAnswer.id)
+
+_DELETE_EXPIRED_BATCH = delete(CachedAnswer).where(
+    CachedAnswer.id.in_(
+        select(CachedAnswer.id)
+        .where(CachedAnswer.expires_at < func.timezone("utc", func.now()))
+        .limit(bindparam("batch_size"))
+        .scalar_subquery()
+    )
+)
+
+# Lookups by cache_key shared across request-scoped repositories. Entries are
+# dropped on writes to their key; id-based and bulk writes clear everything.
+# Counters (hit_count, variation_index, last_used) may lag by up to the TTL.
+# Misses are not cached: another worker may create the key at any moment.
+_key_cache = TTLCache(maxsize=10_000, ttl=60)
+
+
+def _row_builder(columns: tuple) -> Callable[[Any], dict]:
+    """Return a function that turns a row projecting ``columns`` first into a dict."""
+    keys = tuple(column.key for column in columns)
+    # A slice keeps rows that carry extra trailing columns (the window total) working.
+    values = itemgetter(slice(len(keys)))
+    decode_variations = "variations" in keys
+
+    def build(row: Any) -> dict:
+        entry = dict(zip(keys, values(row), strict=True))
+        if decode_variations:
+            entry["variations"] = _loads(entry["variations"])
+        return entry
+
+    return build
+
+
+_entry_dict = _row_builder(_ENTRY_COLUMNS)
+_list_dict = _row_builder(_LIST_COLUMNS)
+_list_with_variations_dict = _row_builder(_LIST_WITH_VARIATIONS_COLUMNS)
+_similarity_dict = _row_builder(_SIMILARITY_COLUMNS)
+_search_dict = _row_builder(_SEARCH_COLUMNS)
+
 
 class SQLAlchemyCacheRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, hit_buffer: CacheHitBuffer | None = None):
         self.session = session
+        self.hit_buffer = hit_buffer
 
     async def get_cache_by_key(self, cache_key: str) -> dict | None:
-        result = await self.session.execute(
-            select(CachedAnswer).where(CachedAnswer.cache_key == cache_key)
-        )
-        cache = result.scalar_one_or_none()
+        now = datetime.utcnow()
 
-        if not cache:
+        cached = _key_cache.get(cache_key)
+        if cached is not None:
+            if cached.expires_at is None or cached.expires_at > now:
+                return _entry_dict(cached)
+            _key_cache.pop(cache_key)
             return None
 
-        return {
-            "id": cache.id,
-            "cache_key": cache.cache_key,
-            "question": cache.question,
-            "context_preview": cache.context_preview,
-            "tfidf_vector": cache.tfidf_vector,
-            "variations": json.loads(cache.variations),
-            "variation_index": cache.variation_index,
-            "cache_type": cache.cache_type,
-            "expires_at": cache.expires_at,
-            "hit_count": cache.hit_count,
-            "created_at": cache.created_at,
-            "last_used": cache.last_used,
-        }
-
-    async def get_cache_by_question(self, question: str) -> dict | None:
-        result = await self.session.execute(
-            select(CachedAnswer).where(CachedAnswer.question == question)
-        )
-        cache = result.scalar_one_or_none()
+        connection = await self.session.connection()
+        result = await connection.exec_driver_sql(_SELECT_BY_KEY_SQL, (cache_key, now))
+        row = result.fetchone()
 
-        if not cache:
+        if not row:
             return None
 
-        return {
-            "id": cache.id,
-            "cache_key": cache.cache_key,
-            "question": cache.question,
-            "context_preview": cache.context_preview,
-            "tfidf_vector": cache.tfidf_vector,
-            "variations": json.loads(cache.variations),
-            "variation_index": cache.variation_index,
-            "cache_type": cache.cache_type,
-            "expires_at": cache.expires_at,
-            "hit_count": cache.hit_count,
-        }
+        # Cache the immutable row and build a fresh dict per hit, so one caller
+        # mutating its entry cannot leak into later lookups.
+        _key_cache.set(cache_key, row)
+        return _entry_dict(row)
+
+    async def get_cache_by_question(self, question: str) -> dict | None:
+        result = await self.session.execute(_SELECT_BY_QUESTION, {"question": question})
+        row = result.one_or_none()
+
+        return _entry_dict(row) if row else None
 
     async def get_all_cached_questions(self) -> list[dict]:
-        result = await self.session.execute(select(CachedAnswer))
-        caches = result.scalars().all()
+        result = await self.session.execute(select(*_SIMILARITY_COLUMNS))
+        return [_similarity_dict(row) for row in result.all()]
 
-        return [
-            {
-                "id": cache.id,
-                "cache_key": cache.cache_key,
-                "question": cache.question,
-                "tfidf_vector": cache.tfidf_vector,
-                "variations": json.loads(cache.variations),
-                "variation_index": cache.variation_index,
-                "cache_type": cache.cache_type,
-                "expires_at": cache.expires_at,
-            }
-            for cache in caches
-        ]
+    async def get_cache_stats(self) -> dict:
+        result = await self.session.execute(_STATS)
+        return dict(result.one()._mapping)
 
     async def create_cache(
         self,
         cache_key: str,
         question: str,
-        tfidf_vector: str,
+        tfidf_vector: bytes,
         answer: str,
         cache_type: str = "knowledge",
         expires_at: datetime | None = None,
         context_preview: str | None = None,
     ) -> int:
-        cache = CachedAnswer(
-            cache_key=cache_key,
-            question=question,
-            context_preview=context_preview,
-            tfidf_vector=tfidf_vector,
-            variations=json.dumps([answer]),
-            variation_index=0,
-            cache_type=cache_type,
-            expires_at=expires_at,
-            hit_count=0,
+        result = await self.session.execute(
+            _UPSERT_CACHE,
+            {
+                "cache_key": cache_key,
+                "question": question,
+                "context_preview": context_preview,
+                "tfidf_vector": tfidf_vector,
+                "variations": _dumps([answer]),
+                "cache_type": cache_type,
+                "expires_at": expires_at,
+            },
         )
-
-        self.session.add(cache)
+        cache_id: int = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(cache)
+        _key_cache.pop(cache_key)
 
-        return cache.id
+        return cache_id
 
     async def add_variation(self, cache_id: int, answer: str) -> None:
-        result = await self.session.execute(select(CachedAnswer).where(CachedAnswer.id == cache_id))
+        result = await self.session.execute(_SELECT_BY_ID, {"cache_id": cache_id})
         cache = result.scalar_one_or_none()
 
         if not cache:
             return
 
-        variations = json.loads(cache.variations)
+        variations = _loads(cache.variations)
 
         if len(variations) < 3:
             variations.append(answer)
-            cache.variations = json.dumps(variations)
+            cache.variations = _dumps(variations)
+            cache.variation_count = len(variations)
             await self.session.commit()
+            _key_cache.pop(cache.cache_key)
 
     async def get_next_variation(self, cache_id: int) -> str:
-        result = await self.session.execute(select(CachedAnswer).where(CachedAnswer.id == cache_id))
-        cache = result.scalar_one_or_none()
+        if self.hit_buffer is not None:
+            result = await self.session.execute(_ROTATE_VARIATION, {"cache_id": cache_id})
+        else:
+            result = await self.session.execute(
+                _ROTATE_VARIATION_AND_COUNT_HIT, {"cache_id": cache_id}
+            )
+        row = result.one_or_none()
+        # Release the row lock now rather than holding it while the caller logs
+        # the turn on the same session.
+        await self.session.commit()
 
-        if not cache:
+        if not row:
             return ""
 
-        variations: list[str] = json.loads(cache.variations)
-        current_index = cache.variation_index
-
-        answer = variations[current_index]
+        if self.hit_buffer is not None:
+            self.hit_buffer.record(cache_id, datetime.utcnow())
 
-        cache.variation_index = (current_index + 1) % len(variations)
-        cache.hit_count += 1
-        cache.last_used = datetime.utcnow()
+        variations: list[str] = _loads(row.variations)
+        served: int = (row.variation_index - 1) % len(variations)
+        return variations[served]
 
-        await self.session.commit()
+    async def delete_expired(self, batch_size: int = 1000) -> int:
+        # Delete in short transactions so a large backlog of expired rows
+        # never holds row locks long enough to stall concurrent writers.
+        deleted = 0
 
-        return answer
+        while True:
+            result = cast(
+                "CursorResult[tuple[()]]",
+                await self.session.execute(_DELETE_EXPIRED_BATCH, {"batch_size": batch_size}),
+            )
+            await self.session.commit()
+            batch = result.rowcount or 0
+            deleted += batch
+            if batch < batch_size:
+                break
 
-    async def delete_expired(self) -> int:
-        result = cast(
-            "CursorResult[tuple[()]]",
-            await self.session.execute(
-                delete(CachedAnswer).where(CachedAnswer.expires_at < datetime.utcnow())
-            ),
-        )
-        await self.session.commit()
-        return result.rowcount or 0
+        if deleted:
+            _key_cache.clear()
+            total_counts.pop(_TABLE)
+        return deleted
 
     async def clear_all_cache(self) -> int:
-        result = cast(
-            "CursorResult[tuple[()]]",
-            await self.session.execute(delete(CachedAnswer)),
-        )
+        result = await self.session.execute(select(func.count(CachedAnswer.id)))
+        count = result.scalar() or 0
+
+        # TRUNCATE drops the heap in one step instead of writing every row to WAL.
+        await self.session.execute(_TRUNCATE)
         await self.session.commit()
-        return result.rowcount or 0
+        _key_cache.clear()
+        total_counts.pop(_TABLE)
+        return count
 
     async def list_cache_entries(
-        self, page: int = 1, limit: int = 20, sort_by: str = "last_used", order: str = "desc"
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "last_used",
+        order: str = "desc",
+        cursor: str | None = None,
+        include_variations: bool = False,
     ) -> dict:
-        offset = (page - 1) * limit
-
-        count_result = await self.session.execute(select(func.count(CachedAnswer.id)))
-        total = count_result.scalar()
+        sort_col = _SORT_COLUMNS.get(sort_by, CachedAnswer.last_used)
+        descending = order == "desc"
 
-        query = select(CachedAnswer)
+        columns: tuple[Any, ...]
+        if include_variations:
+            columns, build = _LIST_WITH_VARIATIONS_COLUMNS, _list_with_variations_dict
+        else:
+            columns, build = _LIST_COLUMNS, _list_dict
 
-        sort_columns = {
-            "hit_count": CachedAnswer.hit_count,
-            "created_at": CachedAnswer.created_at,
-            "last_used": CachedAnswer.last_used,
-            "expires_at": CachedAnswer.expires_at,
-            "cache_type": CachedAnswer.cache_type,
-        }
-        sort_col = sort_columns.get(sort_by, CachedAnswer.last_used)
+        query = select(*columns).order_by(*order_by_keyset(sort_col, CachedAnswer.id, descending))
+        total: int | None = None
 
-        if order == "desc":
-            query = query.order_by(desc(sort_col).nulls_last())
+        if cursor is None:
+            total = total_counts.get(_TABLE)
+            if total is None:
+                query = query.add_columns(func.count().over().label("total"))
+            query = query.offset((page - 1) * limit)
         else:
-            query = query.order_by(sort_col.nulls_last())
-
-        query = query.offset(offset).limit(limit)
+            value, row_id = decode_cursor(cursor, sort_col)
+            query = query.where(seek_after(sort_col, CachedAnswer.id, value, row_id, descending))
+
+        # One extra row tells us whether there is a next page without counting.
+        result = await self.session.execute(query.limit(limit + 1))
+        caches = result.all()
+
+        next_cursor = None
+        if len(caches) > limit:
+            caches = caches[:limit]
+            last = caches[-1]
+            next_cursor = encode_cursor(getattr(last, sort_col.key), last.id)
+
+        entries = [build(row) for row in caches]
+
+        if cursor is not None:
+            return {
+                "entries": entries,
+                "total": None,
+                "page": None,
+                "limit": limit,
+                "total_pages": None,
+                "next_cursor": next_cursor,
+            }
 
-        result = await self.session.execute(query)
-        caches = result.scalars().all()
+        if total is None:
+            if caches:
+                total = caches[0].total
+            elif page > 1:
+                count_result = await self.session.execute(select(func.count(CachedAnswer.id)))
+                total = count_result.scalar() or 0
+            else:
+                total = 0
+            total_counts.set(_TABLE, total)
 
         return {
-            "entries": [
-                {
-                    "id": c.id,
-                    "cache_key": c.cache_key,
-                    "question": c.question,
-                    "context_preview": c.context_preview,
-                    "variations": json.loads(c.variations),
-                    "variation_index": c.variation_index,
-                    "cache_type": c.cache_type,
-                    "expires_at": c.expires_at,
-                    "hit_count": c.hit_count,
-                    "created_at": c.created_at,
-                    "last_used": c.last_used,
-                }
-                for c in caches
-            ],
+            "entries": entries,
             "total": total,
             "page": page,
             "limit": limit,
             "total_pages": (total + limit - 1) // limit if total else 0,
+            "next_cursor": next_cursor,
         }
 
     async def get_cache_by_id(self, cache_id: int) -> dict | None:
-        result = await self.session.execute(select(CachedAnswer).where(CachedAnswer.id == cache_id))
-        cache = result.scalar_one_or_none()
+        result = await self.session.execute(_SELECT_ENTRY_BY_ID, {"cache_id": cache_id})
+        row = result.one_or_none()
 
-        if not cache:
-            return None
-
-        return {
-            "id": cache.id,
-            "cache_key": cache.cache_key,
-            "question": cache.question,
-            "context_preview": cache.context_preview,
-            "tfidf_vector": cache.tfidf_vector,
-            "variations": json.loads(cache.variations),
-            "variation_index": cache.variation_index,
-            "cache_type": cache.cache_type,
-            "expires_at": cache.expires_at,
-            "hit_count": cache.hit_count,
-            "created_at": cache.created_at,
-            "last_used": cache.last_used,
-        }
+        return _entry_dict(row) if row else None
 
     async def delete_cache_by_id(self, cache_id: int) -> bool:
         result = cast(
@@ -236,41 +434,31 @@ class SQLAlchemyCacheRepository:
             await self.session.execute(delete(CachedAnswer).where(CachedAnswer.id == cache_id)),
         )
         await self.session.commit()
+        _key_cache.clear()
+        total_counts.pop(_TABLE)
         return (result.rowcount or 0) > 0
 
     async def update_cache_variations(self, cache_id: int, variations: list[str]) -> bool:
-        result = await self.session.execute(select(CachedAnswer).where(CachedAnswer.id == cache_id))
+        result = await self.session.execute(_SELECT_BY_ID, {"cache_id": cache_id})
         cache = result.scalar_one_or_none()
 
         if not cache:
             return False
 
         variations = variations[:3]
-        cache.variations = json.dumps(variations)
+        cache.variations = _dumps(variations)
+        cache.variation_count = len(variations)
         cache.variation_index = 0
 
         await self.session.commit()
+        _key_cache.pop(cache.cache_key)
         return True
 
     async def search_cache(self, query: str, limit: int = 20) -> list[dict]:
         result = await self.session.execute(
-            select(CachedAnswer)
-            .where(CachedAnswer.question.ilike(f"%{query}%"))
+            select(*_SEARCH_COLUMNS)
+            .where(CachedAnswer.question.icontains(query, autoescape=True))
             .order_by(desc(CachedAnswer.hit_count))
             .limit(limit)
         )
-        caches = result.scalars().all()
-
-        return [
-            {
-                "id": c.id,
-                "cache_key": c.cache_key,
-                "question": c.question,
-                "context_preview": c.context_preview,
-                "cache_type": c.cache_type,
-                "expires_at": c.expires_at,
-                "hit_count": c.hit_count,
-                "last_used": c.last_used,
-            }
-            for c in caches
-        ]
+        return [_search_dict(row) for row in result.all()]
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+
+from config import Config
+
+from .cache_repo import SQLAlchemyCacheRepository
+from .connection import get_session
+
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_expired_cache(config: Config, interval: float, batch_size: int = 1000) -> None:
+    """Periodically delete expired cache entries off the request path."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with get_session(config) as session:
+                deleted = await SQLAlchemyCacheRepository(session).delete_expired(batch_size)
+            if deleted:
+                logger.info("Swept %d expired cache entries", deleted)
+        except Exception:
+            logger.exception("Failed to sweep expired cache entries")
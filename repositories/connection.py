@@ -24,8 +24,15 @@ def get_engine(config: Config):
             config.database_url,
             pool_size=config.db_pool_size,
             max_overflow=config.db_max_overflow,
+            pool_recycle=config.db_pool_recycle,
             echo=config.db_echo,
             pool_pre_ping=True,
+            # Reuse server-side prepared statements per connection; set to 0
+            # when running behind a transaction-pooling PgBouncer.
+            connect_args={
+                "statement_cache_size": config.db_statement_cache_size,
+                "prepared_statement_cache_size": config.db_statement_cache_size,
+            },
         )
 
     return _engine
@@ -52,6 +59,9 @@ async def get_session(config: Config) -> AsyncGenerator[AsyncSession, None]:
     session = factory()
     try:
         yield session
+        # Repository writes commit per call so no row lock outlives the call that
+        # took it; this only ends the transaction left open by plain reads.
+        await session.commit()
     except Exception:
         await session.rollback()
         raise
@@ -1,30 +1,58 @@
 from datetime import datetime
-import json
+from types import MappingProxyType
 
-from sqlalchemy import delete, desc, func, select, update
+import orjson
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from models.models import Conversation, Session
 
+from .conversation_writer import ConversationWriter
+from .pagination import decode_cursor, encode_cursor, order_by_keyset, seek_after, total_counts
+
+
+_SORT_COLUMNS = MappingProxyType(
+    {"created_at": Session.created_at, "last_activity": Session.last_activity}
+)
+
+
+# DO NOTHING leaves an existing session untouched, so a lookup does not bump its
+# last_activity; only a logged turn does that.
+_INSERT_NEW_SESSION = (
+    insert(Session)
+    .on_conflict_do_nothing(index_elements=[Session.session_id])
+    .returning(Session.id)
+)
+
+_SELECT_SESSION_ID = select(Session.id).where(Session.session_id == bindparam("session_id"))
+
+_INSERT_CONVERSATION = insert(Conversation).returning(Conversation.id)
+
+_TOUCH_SESSION = (
+    update(Session)
+    .where(Session.id == bindparam("session_db_id"))
+    .values(last_activity=bindparam("now"))
+)
+
 
 class SQLAlchemyConversationRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, writer: ConversationWriter | None = None):
         self.session = session
+        self.writer = writer
 
     async def create_session(self, session_id: str, user_ip: str | None) -> int:
-        result = await self.session.execute(select(Session).where(Session.session_id == session_id))
-        existing = result.scalar_one_or_none()
-
-        if existing:
-            return existing.id
-
-        new_session = Session(session_id=session_id, user_ip=user_ip)
-        self.session.add(new_session)
+        result = await self.session.execute(
+            _INSERT_NEW_SESSION, {"session_id": session_id, "user_ip": user_ip}
+        )
+        session_db_id: int | None = result.scalar_one_or_none()
+        if session_db_id is None:
+            result = await self.session.execute(_SELECT_SESSION_ID, {"session_id": session_id})
+            session_db_id = result.scalar_one()
         await self.session.commit()
-        await self.session.refresh(new_session)
 
-        return new_session.id
+        return session_db_id
 
     async def log_conversation(
         self,
@@ -35,34 +63,37 @@ class SQLAlchemyConversationRepository:
         evaluator_used: bool = False,
         evaluator_passed: bool | None = None,
     ) -> int:
+        params = {
+            "session_id": session_db_id,
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "tool_calls": orjson.dumps(tool_calls).decode() if tool_calls else None,
+            "evaluator_used": evaluator_used,
+            "evaluator_passed": evaluator_passed,
+        }
 
-        conversation = Conversation(
-            session_id=session_db_id,
-            user_message=user_message,
-            bot_response=bot_response,
-            tool_calls=json.dumps(tool_calls) if tool_calls else None,
-            evaluator_used=evaluator_used,
-            evaluator_passed=evaluator_passed,
-        )
+        if self.writer is not None and self.writer.running:
+            return await self.writer.submit(params)
 
-        self.session.add(conversation)
+        result = await self.session.execute(_INSERT_CONVERSATION, params)
+        conversation_id: int = result.scalar_one()
 
         await self.session.execute(
-            update(Session)
-            .where(Session.id == session_db_id)
-            .values(last_activity=datetime.utcnow())
+            _TOUCH_SESSION, {"session_db_id": session_db_id, "now": datetime.utcnow()}
         )
-
         await self.session.commit()
-        await self.session.refresh(conversation)
 
-        return conversation.id
+        return conversation_id
 
     async def get_session_by_id(self, session_id: str) -> dict | None:
         result = await self.session.execute(
             select(Session)
             .where(Session.session_id == session_id)
-            .options(selectinload(Session.conversations))
+            .options(
+                selectinload(Session.conversations).load_only(
+                    Conversation.user_message, Conversation.bot_response, Conversation.timestamp
+                )
+            )
         )
         session = result.scalar_one_or_none()
 
@@ -85,28 +116,60 @@ class SQLAlchemyConversationRepository:
         }
 
     async def list_sessions(
-        self, page: int = 1, limit: int = 20, sort_by: str = "created_at", order: str = "desc"
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        cursor: str | None = None,
     ) -> dict:
-        offset = (page - 1) * limit
-
-        count_result = await self.session.execute(select(func.count(Session.id)))
-        total = count_result.scalar()
+        sort_col = _SORT_COLUMNS.get(sort_by, Session.created_at)
+        descending = order == "desc"
+
+        message_count = (
+            select(func.count())
+            .where(Conversation.session_id == Session.id)
+            .correlate(Session)
+            .scalar_subquery()
+        )
+        query = select(Session, message_count.label("message_count")).order_by(
+            *order_by_keyset(sort_col, Session.id, descending)
+        )
 
-        query = select(Session).options(selectinload(Session.conversations))
+        total: int | None = None
+        page_number: int | None = None
+        total_pages: int | None = None
 
-        if sort_by == "created_at":
-            sort_col = Session.created_at
-        elif sort_by == "last_activity":
-            sort_col = Session.last_activity
+        if cursor is None:
+            total = total_counts.get(Session.__tablename__)
+            if total is None:
+                query = query.add_columns(func.count().over().label("total"))
+            query = query.offset((page - 1) * limit)
         else:
-            sort_col = Session.created_at
-
-        query = query.order_by(desc(sort_col)) if order == "desc" else query.order_by(sort_col)
-
-        query = query.offset(offset).limit(limit)
-
-        result = await self.session.execute(query)
-        sessions = result.scalars().all()
+            value, row_id = decode_cursor(cursor, sort_col)
+            query = query.where(seek_after(sort_col, Session.id, value, row_id, descending))
+
+        result = await self.session.execute(query.limit(limit + 1))
+        rows = result.all()
+
+        if cursor is None:
+            if total is None:
+                if rows:
+                    total = rows[0].total
+                elif page > 1:
+                    count_result = await self.session.execute(select(func.count(Session.id)))
+                    total = count_result.scalar() or 0
+                else:
+                    total = 0
+                total_counts.set(Session.__tablename__, total)
+            page_number = page
+            total_pages = (total + limit - 1) // limit if total else 0
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor(getattr(last, sort_col.key), last.id)
 
         return {
             "sessions": [
@@ -116,14 +179,15 @@ class SQLAlchemyConversationRepository:
                     "user_ip": s.user_ip,
                     "created_at": s.created_at,
                     "last_activity": s.last_activity,
-                    "message_count": len(s.conversations),
+                    "message_count": count,
                 }
-                for s in sessions
+                for s, count, *_ in rows
             ],
             "total": total,
-            "page": page,
+            "page": page_number,
             "limit": limit,
-            "total_pages": (total + limit - 1) // limit if total else 0,
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
         }
 
     async def delete_session(self, session_id: str) -> bool:
@@ -135,14 +199,17 @@ class SQLAlchemyConversationRepository:
 
         await self.session.delete(session_obj)
         await self.session.commit()
+        total_counts.pop(Session.__tablename__)
         return True
 
     async def clear_all_sessions(self) -> int:
         result = await self.session.execute(select(func.count(Session.id)))
         count = result.scalar() or 0
 
-        await self.session.execute(delete(Conversation))
-        await self.session.execute(delete(Session))
+        await self.session.execute(
+            text(f"TRUNCATE TABLE {Conversation.__tablename__}, {Session.__tablename__}")
+        )
 
         await self.session.commit()
+        total_counts.pop(Session.__tablename__)
         return count
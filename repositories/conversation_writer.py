@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from models.models import Conversation, Session
+
+from .connection import get_session
+
+
+logger = logging.getLogger(__name__)
+
+_INSERT_CONVERSATIONS = insert(Conversation).returning(
+    Conversation.id, sort_by_parameter_order=True
+)
+
+
+class ConversationWriter:
+    """Micro-batches conversation inserts so many turns share one transaction."""
+
+    def __init__(self, max_batch: int = 128, window: float = 0.01):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue: asyncio.Queue[tuple[dict, asyncio.Future[int]]] = asyncio.Queue()
+        self.running = False
+
+    async def submit(self, params: dict) -> int:
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((params, future))
+        return await future
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def write(self, session: AsyncSession, batch: list[tuple[dict, asyncio.Future[int]]]):
+        params = [item for item, _ in batch]
+
+        result = await session.execute(_INSERT_CONVERSATIONS, params)
+        ids = result.scalars().all()
+
+        await session.execute(
+            update(Session)
+            .where(Session.id.in_({item["session_id"] for item in params}))
+            .values(last_activity=datetime.utcnow())
+        )
+        await session.commit()
+
+        for (_, future), conversation_id in zip(batch, ids, strict=True):
+            if not future.done():
+                future.set_result(conversation_id)
+
+    async def run(self, config: Config) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[tuple[dict, asyncio.Future[int]]] = []
+        in_flight: asyncio.Task[None] | None = None
+        # Queues bind to the loop that first waits on them; start fresh on this one.
+        self._queue = asyncio.Queue()
+        self.running = True
+        try:
+            while True:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.window
+
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+
+                pending, batch = batch, []
+                # Shielded so a cancellation mid-write still lets the batch finish
+                # and resolve its submitters below.
+                in_flight = asyncio.create_task(self._write_with_session(config, pending))
+                await asyncio.shield(in_flight)
+        finally:
+            self.running = False
+            if in_flight is not None:
+                await in_flight
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for start in range(0, len(batch), self.max_batch):
+                await self._write_with_session(config, batch[start : start + self.max_batch])
+
+    async def _write_with_session(
+        self, config: Config, batch: list[tuple[dict, asyncio.Future[int]]]
+    ) -> None:
+        try:
+            async with get_session(config) as session:
+                await self.write(session, batch)
+        except Exception as e:
+            pending = [item for item in batch if not item[1].done()]
+            if len(pending) > 1:
+                # Rows from unrelated requests share the batch; retry them one at a
+                # time so only the submitter of a bad row sees the error.
+                logger.warning(
+                    "Failed to write %d conversation rows, retrying individually",
+                    len(pending),
+                    exc_info=True,
+                )
+                for item in pending:
+                    await self._write_with_session(config, [item])
+                return
+
+            logger.exception("Failed to write %d conversation rows", len(pending))
+            for _, future in pending:
+                future.set_exception(e)
+
+
+conversation_writer = ConversationWriter()
@@ -0,0 +1,67 @@
+import base64
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from sqlalchemy import ColumnElement, and_, or_, tuple_
+
+from .ttl_cache import TTLCache
+
+
+# Exact row totals for paged admin listings, keyed by table name. Deletes made
+# through the repositories drop their table's entry; inserts may lag by the TTL.
+total_counts = TTLCache(maxsize=16, ttl=30)
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([value, row_id])).decode()
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, sort_col: Any) -> tuple[Any, int]:
+    """Decode a cursor, rejecting a sort value that does not fit ``sort_col``'s type."""
+    try:
+        value, row_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        expected = sort_col.type.python_type
+        if value is None:
+            valid = sort_col.expression.nullable
+        elif expected is datetime:
+            value = datetime.fromisoformat(value)
+            valid = True
+        elif expected is int:
+            valid = _is_int(value)
+        else:
+            valid = isinstance(value, expected)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not valid or not _is_int(row_id):
+        raise ValueError("Invalid pagination cursor")
+
+    return value, row_id
+
+
+@lru_cache(maxsize=32)
+def order_by_keyset(sort_col: Any, id_col: Any, descending: bool) -> tuple:
+    if descending:
+        return sort_col.desc().nulls_last(), id_col.desc()
+    return sort_col.asc().nulls_last(), id_col.asc()
+
+
+def seek_after(
+    sort_col: Any, id_col: Any, value: Any, row_id: int, descending: bool
+) -> ColumnElement[bool]:
+    """Rows that follow ``(value, row_id)`` in :func:`order_by_keyset` order."""
+    if value is None:
+        return and_(sort_col.is_(None), id_col < row_id if descending else id_col > row_id)
+
+    key = tuple_(sort_col, id_col)
+    after = key < (value, row_id) if descending else key > (value, row_id)
+
+    if sort_col.expression.nullable:
+        return or_(after, sort_col.is_(None))
+    return after
@@ -1,12 +1,13 @@
 import hashlib
 from datetime import datetime, timedelta
-from enum import Enum
+from enum import Enum, unique
 
 from repositories.cache_repo import SQLAlchemyCacheRepository
 
 from .similarity_service import SimilarityService
 
 
+@unique
 class CacheType(str, Enum):
     KNOWLEDGE = "knowledge"
     CONVERSATIONAL = "conversational"
@@ -16,56 +17,61 @@ CACHE_TTL = {
     CacheType.CONVERSATIONAL: timedelta(hours=24),
 }
 
-CACHE_DENYLIST = {
-    "ok",
-    "okay",
-    "yes",
-    "no",
-    "yeah",
-    "yep",
-    "nope",
-    "yea",
-    "nah",
-    "thanks",
-    "thank you",
-    "thx",
-    "ty",
-    "thank",
-    "thankyou",
-    "continue",
-    "go on",
-    "go ahead",
-    "more",
-    "next",
-    "sure",
-    "alright",
-    "right",
-    "got it",
-    "understood",
-    "i understand",
-    "cool",
-    "nice",
-    "great",
-    "awesome",
-    "perfect",
-    "good",
-    "fine",
-    "hmm",
-    "hm",
-    "ah",
-    "oh",
-    "i see",
-    "uh",
-    "um",
-    "wow",
-    "k",
-    "kk",
-    "ya",
-    "ye",
-    "na",
-    "lol",
-    "haha",
-}
+# Indexed by is_continuation (False -> 0, True -> 1).
+_CACHE_TYPE_BY_CONTINUATION = (CacheType.KNOWLEDGE, CacheType.CONVERSATIONAL)
+
+CACHE_DENYLIST = frozenset(
+    {
+        "ok",
+        "okay",
+        "yes",
+        "no",
+        "yeah",
+        "yep",
+        "nope",
+        "yea",
+        "nah",
+        "thanks",
+        "thank you",
+        "thx",
+        "ty",
+        "thank",
+        "thankyou",
+        "continue",
+        "go on",
+        "go ahead",
+        "more",
+        "next",
+        "sure",
+        "alright",
+        "right",
+        "got it",
+        "understood",
+        "i understand",
+        "cool",
+        "nice",
+        "great",
+        "awesome",
+        "perfect",
+        "good",
+        "fine",
+        "hmm",
+        "hm",
+        "ah",
+        "oh",
+        "i see",
+        "uh",
+        "um",
+        "wow",
+        "k",
+        "kk",
+        "ya",
+        "ye",
+        "na",
+        "lol",
+        "haha",
+    }
+)
 
 MIN_TOKENS_FOR_CACHE = 4
 
@@ -80,36 +86,33 @@ class CacheService:
         self.cache_repo = cache_repo
         self.similarity = similarity_service
         self.persona_hash = persona_hash
+        self._key_prefix = f"{persona_hash}||".encode()
 
     def should_skip_cache(self, message: str, is_continuation: bool = False) -> bool:
-        normalized = message.lower().strip()
-        tokens = normalized.split()
-        token_count = len(tokens)
-
         if "?" in message:
-            question_text = normalized.strip(" ?!.,")
+            question_text = message.lower().strip().strip(" ?!.,")
             return not question_text or question_text in CACHE_DENYLIST
 
-        if token_count < 2:
-            return True
-
-        if is_continuation and normalized in CACHE_DENYLIST:
-            return True
-
+        # Every denylisted phrase is shorter than MIN_TOKENS_FOR_CACHE, so the token
+        # floor already skips them, continuation or not; only count that far.
+        token_count = len(message.split(maxsplit=MIN_TOKENS_FOR_CACHE - 1))
         return token_count < MIN_TOKENS_FOR_CACHE
 
     def get_cache_type(self, is_continuation: bool) -> CacheType:
-        if is_continuation:
-            return CacheType.CONVERSATIONAL
-        return CacheType.KNOWLEDGE
+        return _CACHE_TYPE_BY_CONTINUATION[is_continuation]
 
     def calculate_expiry(self, cache_type: CacheType) -> datetime:
         return datetime.utcnow() + CACHE_TTL[cache_type]
 
     def build_cache_key(self, message: str, last_assistant_message: str | None = None) -> str:
-        context = last_assistant_message or ""
-        combined = f"{self.persona_hash}||{context}||{message}"
-        return hashlib.sha256(combined.encode()).hexdigest()
+        # Streams the same bytes as f"{persona_hash}||{context}||{message}", so
+        # keys stay stable without building the joined string first.
+        digest = hashlib.sha256(self._key_prefix)
+        if last_assistant_message:
+            digest.update(last_assistant_message.encode())
+        digest.update(b"||")
+        digest.update(message.encode())
+        return digest.hexdigest()
 
     async def get_cached_answer(
         self, message: str, last_assistant_message: str | None = None, is_continuation: bool = False
@@ -119,12 +122,10 @@ class CacheService:
 
         cache_key = self.build_cache_key(message, last_assistant_message)
 
+        # Key lookups never return expired entries; the sweeper reclaims them.
         exact_match = await self.cache_repo.get_cache_by_key(cache_key)
         if exact_match:
-            if exact_match.get("expires_at") and exact_match["expires_at"] < datetime.utcnow():
-                await self.cache_repo.delete_cache_by_id(exact_match["id"])
-            else:
-                return await self.cache_repo.get_next_variation(exact_match["id"])
+            return await self.cache_repo.get_next_variation(exact_match["id"])
 
         return None
 
@@ -159,7 +160,7 @@ class CacheService:
             question=message,
             tfidf_vector=tfidf_vector,
             answer=answer,
-            cache_type=cache_type.value,
+            cache_type=cache_type,
             expires_at=expires_at,
             context_preview=context_preview,
         )
@@ -183,16 +184,10 @@ class CacheService:
         return await self.cache_repo.delete_expired()
 
     async def get_cache_stats(self) -> dict:
-        all_cached = await self.cache_repo.get_all_cached_questions()
+        stats = await self.cache_repo.get_cache_stats()
 
-        total_questions = len(all_cached)
-        total_variations = sum(len(c.get("variations", [])) for c in all_cached)
-
-        knowledge_count = sum(1 for c in all_cached if c.get("cache_type") == "knowledge")
-        conversational_count = sum(1 for c in all_cached if c.get("cache_type") == "conversational")
-
-        now = datetime.utcnow()
-        expired_count = sum(1 for c in all_cached if c.get("expires_at") and c["expires_at"] < now)
+        total_questions = stats["total_questions"]
+        total_variations = stats["total_variations"]
 
         return {
             "total_questions": total_questions,
@@ -200,15 +195,23 @@ class CacheService:
             "avg_variations_per_question": total_variations / total_questions
             if total_questions > 0
             else 0,
-            "knowledge_entries": knowledge_count,
-            "conversational_entries": conversational_count,
-            "expired_entries": expired_count,
+            "knowledge_entries": stats["knowledge_entries"],
+            "conversational_entries": stats["conversational_entries"],
+            "expired_entries": stats["expired_entries"],
         }
 
     async def list_cache_entries(
-        self, page: int = 1, limit: int = 20, sort_by: str = "last_used", order: str = "desc"
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "last_used",
+        order: str = "desc",
+        cursor: str | None = None,
+        include_variations: bool = False,
     ) -> dict:
-        return await self.cache_repo.list_cache_entries(page, limit, sort_by, order)
+        return await self.cache_repo.list_cache_entries(
+            page, limit, sort_by, order, cursor, include_variations
+        )
 
     async def get_cache_by_id(self, cache_id: int) -> dict | None:
         return await self.cache_repo.get_cache_by_id(cache_id)
@@ -84,14 +84,27 @@ class ConversationLogger:
         return await self.cache_service.cleanup_expired()
 
     async def list_sessions(
-        self, page: int = 1, limit: int = 20, sort_by: str = "created_at", order: str = "desc"
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        cursor: str | None = None,
     ) -> dict:
-        return await self.conversation_repo.list_sessions(page, limit, sort_by, order)
+        return await self.conversation_repo.list_sessions(page, limit, sort_by, order, cursor)
 
     async def list_cache_entries(
-        self, page: int = 1, limit: int = 20, sort_by: str = "last_used", order: str = "desc"
+        self,
+        page: int = 1,
+        limit: int = 20,
+        sort_by: str = "last_used",
+        order: str = "desc",
+        cursor: str | None = None,
+        include_variations: bool = False,
     ) -> dict:
-        return await self.cache_service.list_cache_entries(page, limit, sort_by, order)
+        return await self.cache_service.list_cache_entries(
+            page, limit, sort_by, order, cursor, include_variations
+        )
 
     async def get_cache_entry(self, cache_id: int) -> dict | None:
         return await self.cache_service.get_cache_by_id(cache_id)
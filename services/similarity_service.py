@@ -1,12 +1,16 @@
-import json
-
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+
+# TF-IDF weights are L2-normalized into [0, 1], so half precision is plenty.
+VECTOR_DTYPE = np.float16
 
 
 class SimilarityService:
     def __init__(self, threshold: float = 0.80):
+        # sklearn takes over a second to import, so it is loaded when a service is
+        # built rather than by every process that imports the services package.
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
         self.threshold = threshold
         self.vectorizer = TfidfVectorizer(
             lowercase=True,
@@ -16,50 +20,64 @@ class SimilarityService:
         )
         self._is_fitted = False
 
-    def vectorize(self, question: str) -> str:
-        if not self._is_fitted:
-            vector = self.vectorizer.fit_transform([question])
-            self._is_fitted = True
-        else:
+    def vectorize(self, question: str) -> bytes:
+        from sklearn.base import clone
+
+        if self._is_fitted:
             vector = self.vectorizer.transform([question])
+        else:
+            # Until fit on a corpus, fit a throwaway copy per question; keeping a
+            # one-question vocabulary would leave every later vector mostly zero.
+            vector = clone(self.vectorizer).fit_transform([question])
 
-        vector_array = vector.toarray()[0].tolist()
-        return json.dumps(vector_array)
+        return bytes(vector.toarray()[0].astype(VECTOR_DTYPE).tobytes())
 
-    def deserialize_vector(self, vector_json: str) -> np.ndarray:
-        return np.array(json.loads(vector_json))
+    def deserialize_vector(self, vector_bytes: bytes) -> np.ndarray:
+        return np.frombuffer(vector_bytes, dtype=VECTOR_DTYPE).astype(np.float32)
 
     def calculate_similarity(self, vector1: np.ndarray, vector2: np.ndarray) -> float:
-        max_len = max(len(vector1), len(vector2))
-        v1 = np.pad(vector1, (0, max_len - len(vector1)))
-        v2 = np.pad(vector2, (0, max_len - len(vector2)))
-
-        v1 = v1.reshape(1, -1)
-        v2 = v2.reshape(1, -1)
-
-        similarity = cosine_similarity(v1, v2)[0][0]
-        return float(similarity)
+        # Zero-padding the shorter vector adds nothing to the dot product, so score
+        # the shared prefix against the full norms instead of padding both.
+        shared = min(len(vector1), len(vector2))
+        norms = float(np.linalg.norm(vector1) * np.linalg.norm(vector2))
+        if norms == 0.0:
+            return 0.0
+        return float(np.dot(vector1[:shared], vector2[:shared]) / norms)
 
     def find_best_match(self, question: str, cached_questions: list[dict]) -> dict | None:
+        from sklearn.metrics.pairwise import cosine_similarity
+
         if not cached_questions:
             return None
 
         new_vector = self.deserialize_vector(self.vectorize(question))
+        cached_vectors = [self.deserialize_vector(c["tfidf_vector"]) for c in cached_questions]
 
-        best_match = None
-        best_score = 0.0
-
-        for cached in cached_questions:
-            cached_vector = self.deserialize_vector(cached["tfidf_vector"])
-            score = self.calculate_similarity(new_vector, cached_vector)
+        # Score every candidate in one matrix product; shorter vectors are zero-padded.
+        width = max(len(new_vector), *(len(v) for v in cached_vectors))
+        matrix = np.zeros((len(cached_vectors), width), dtype=np.float32)
+        for row, vector in zip(matrix, cached_vectors, strict=True):
+            row[: len(vector)] = vector
+        query = np.zeros((1, width), dtype=np.float32)
+        query[0, : len(new_vector)] = new_vector
 
-            if score >= self.threshold and score > best_score:
-                best_score = score
-                best_match = {**cached, "similarity_score": score}
+        scores = cosine_similarity(matrix, query).ravel()
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
 
-        return best_match
+        if best_score < self.threshold or best_score <= 0.0:
+            return None
+        return {**cached_questions[best], "similarity_score": best_score}
 
     def fit_on_corpus(self, questions: list[str]) -> None:
-        if questions:
-            self.vectorizer.fit(questions)
-            self._is_fitted = True
+        from sklearn.base import clone
+
+        if len(questions) < 2:
+            return
+
+        # Fit a copy and swap it in, so concurrent vectorize() calls never see a
+        # half-fitted vocabulary.
+        vectorizer = clone(self.vectorizer)
+        vectorizer.fit(questions)
+        self.vectorizer = vectorizer
+        self._is_fitted = True
@@ -0,0 +1,61 @@
+import logging
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from api import dependencies
+
+
+class TestGetSimilarityService:
+    def test_returns_one_shared_instance(self):
+        dependencies.get_similarity_service.cache_clear()
+
+        first = dependencies.get_similarity_service()
+        second = dependencies.get_similarity_service()
+
+        assert first is second
+        dependencies.get_similarity_service.cache_clear()
+
+
+class TestWarmSimilarityService:
+    @pytest.mark.asyncio
+    async def test_builds_service_off_the_event_loop(self, monkeypatch):
+        loop_thread = threading.get_ident()
+        build_threads = []
+
+        def fake_get_similarity_service():
+            build_threads.append(threading.get_ident())
+            return MagicMock()
+
+        monkeypatch.setattr(dependencies, "get_similarity_service", fake_get_similarity_service)
+
+        await dependencies.warm_similarity_service()
+
+        assert len(build_threads) == 1
+        assert build_threads[0] != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_logs_instead_of_raising_when_build_fails(self, monkeypatch, caplog):
+        monkeypatch.setattr(
+            dependencies, "get_similarity_service", MagicMock(side_effect=ImportError("sklearn"))
+        )
+
+        with caplog.at_level(logging.WARNING, logger="api.dependencies"):
+            await dependencies.warm_similarity_service()
+
+        assert "Could not build the similarity service" in caplog.text
+
+
+class TestGetConversationLogger:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("running", [True, False])
+    async def test_buffers_hits_only_while_flusher_runs(self, running, monkeypatch):
+        monkeypatch.setattr(dependencies.cache_hit_buffer, "running", running)
+        monkeypatch.setattr(dependencies, "get_similarity_service", MagicMock())
+        monkeypatch.setattr(dependencies, "get_persona", MagicMock())
+
+        logger = await dependencies.get_conversation_logger(AsyncMock())
+
+        hit_buffer = logger.cache_service.cache_repo.hit_buffer
+        assert (hit_buffer is dependencies.cache_hit_buffer) is running
@@ -1,22 +1,30 @@
-from unittest.mock import AsyncMock, MagicMock, patch
+from contextlib import ExitStack
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.dialects import postgresql
 
+from api.dependencies import get_chat_service
 from api.main import app
 from api.middleware.rate_limit import _build_increment_statement
 from api.middleware.rate_limit_state import rate_limit_state
 
 
-@pytest.fixture
-def client(monkeypatch):
-    monkeypatch.setenv("API_KEY", "test-api-key")
-    monkeypatch.setenv("ALLOWED_ORIGINS", "http://localhost:3000")
-    monkeypatch.setenv("LLM_PROVIDER", "openai")
-    monkeypatch.setenv("LLM_API_KEY", "test-key-123")
-    monkeypatch.setenv("LLM_MODEL", "gpt-4")
+# The limiter never reads the body, so every chat request reuses one encoded payload.
+CHAT_BODY = b'{"message": "test", "history": []}'
+CHAT_HEADERS = {"X-API-Key": "test-api-key", "Content-Type": "application/json"}
+
+CONFIG_TARGETS = (
+    "api.dependencies.get_config",
+    "api.main.get_config",
+    "api.middleware.auth.get_config",
+    "api.middleware.rate_limit.get_config",
+)
+
 
+@pytest.fixture(scope="module")
+def client():
     from config import Config
 
     test_config = Config(
@@ -33,22 +41,33 @@ def client(monkeypatch):
         rate_limit_per_hour=15,
     )
 
-    with (
-        patch("api.dependencies.get_config", return_value=test_config),
-        patch("api.main.get_config", return_value=test_config),
-        patch("api.middleware.auth.get_config", return_value=test_config),
-        patch("api.middleware.rate_limit.get_config", return_value=test_config),
-    ):
+    # Built once per module; reset_rate_limit still isolates limiter state per test.
+    with ExitStack() as stack:
+        for target in CONFIG_TARGETS:
+            stack.enter_context(patch(target, return_value=test_config))
+        mp = stack.enter_context(pytest.MonkeyPatch.context())
+        mp.setenv("API_KEY", "test-api-key")
+        mp.setenv("ALLOWED_ORIGINS", "http://localhost:3000")
+        mp.setenv("LLM_PROVIDER", "openai")
+        mp.setenv("LLM_API_KEY", "test-key-123")
+        mp.setenv("LLM_MODEL", "gpt-4")
+
         yield TestClient(app)
 
 
+class StubChatService:
+    async def chat(self, message: str, history: list[dict]) -> str:
+        return "Test response"
+
+
 @pytest.fixture
 def mock_chat_service():
-    with patch("api.dependencies.get_chat_service") as mock:
-        service = AsyncMock()
-        service.chat.return_value = "Test response"
-        mock.return_value = service
-        yield service
+    # Override the dependency itself: the route resolved get_chat_service at import
+    # time, so patching the module attribute never reached it.
+    service = StubChatService()
+    app.dependency_overrides[get_chat_service] = lambda: service
+    yield service
+    app.dependency_overrides.pop(get_chat_service, None)
 
 
 @pytest.fixture(autouse=True)
@@ -59,25 +78,25 @@ def reset_rate_limit():
 
 class TestRateLimiting:
     def test_chat_endpoint_enforces_rate_limit(self, client, mock_chat_service):
-        counter = {"value": 0}
+        # Start the counter one short of the limit instead of spending 14 requests on it.
+        counter = {"value": 14}
 
         async def mock_increment(key: str) -> int:
             counter["value"] += 1
             return counter["value"]
 
         with patch("api.middleware.rate_limit._increment_counter", side_effect=mock_increment):
-            for i in range(15):
-                response = client.post(
-                    "/api/v1/chat",
-                    json={"message": f"test {i}", "history": []},
-                    headers={"X-API-Key": "test-api-key"},
-                )
-                assert response.status_code == 200
+            response = client.post(
+                "/api/v1/chat",
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
+            )
+            assert response.status_code == 200
 
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test 16", "history": []},
-                headers={"X-API-Key": "test-api-key"},
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
             )
             assert response.status_code == 429
 
@@ -88,8 +107,8 @@ class TestRateLimiting:
         with patch("api.middleware.rate_limit._increment_counter", side_effect=mock_increment):
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test", "history": []},
-                headers={"X-API-Key": "test-api-key"},
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
             )
             assert response.status_code == 429
             assert "detail" in response.json()
@@ -101,27 +120,42 @@ class TestRateLimiting:
         with patch("api.middleware.rate_limit._increment_counter", side_effect=mock_increment):
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test", "history": []},
-                headers={"X-API-Key": "test-api-key"},
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
             )
             assert response.status_code == 429
             assert "retry-after" in response.headers
 
     def test_health_endpoint_not_rate_limited(self, client):
-        for _ in range(20):
+        # One request against an exhausted counter proves the limiter is not consulted.
+        async def mock_increment(key: str) -> int:
+            return 100
+
+        with patch(
+            "api.middleware.rate_limit._increment_counter", side_effect=mock_increment
+        ) as increment:
             response = client.get("/health")
-            assert response.status_code == 200
+
+        assert response.status_code == 200
+        increment.assert_not_called()
 
     def test_rate_limiting_disabled(self, client, mock_chat_service):
         rate_limit_state.update_settings(enabled=False, rate_per_hour=15)
 
-        for i in range(20):
+        async def mock_increment(key: str) -> int:
+            return 100
+
+        with patch(
+            "api.middleware.rate_limit._increment_counter", side_effect=mock_increment
+        ) as increment:
             response = client.post(
                 "/api/v1/chat",
-                json={"message": f"test {i}", "history": []},
-                headers={"X-API-Key": "test-api-key"},
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
             )
-            assert response.status_code == 200
+
+        assert response.status_code == 200
+        increment.assert_not_called()
 
     def test_rate_limit_fails_open(self, client, mock_chat_service):
         async def mock_increment_error(key: str) -> int:
@@ -132,8 +166,8 @@ class TestRateLimiting:
         ):
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test", "history": []},
-                headers={"X-API-Key": "test-api-key"},
+                content=CHAT_BODY,
+                headers=CHAT_HEADERS,
             )
             assert response.status_code == 200
 
@@ -147,9 +181,9 @@ class TestRateLimiting:
         with patch("api.middleware.rate_limit._increment_counter", side_effect=mock_increment):
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test", "history": []},
+                content=CHAT_BODY,
                 headers={
-                    "X-API-Key": "test-api-key",
+                    **CHAT_HEADERS,
                     "X-Forwarded-For": "203.0.113.10, 10.0.0.1",
                 },
             )
@@ -167,9 +201,9 @@ class TestRateLimiting:
         with patch("api.middleware.rate_limit._increment_counter", side_effect=mock_increment):
             response = client.post(
                 "/api/v1/chat",
-                json={"message": "test", "history": []},
+                content=CHAT_BODY,
                 headers={
-                    "X-API-Key": "test-api-key",
+                    **CHAT_HEADERS,
                     "Fly-Client-IP": "198.51.100.20",
                     "X-Forwarded-For": "203.0.113.10, 10.0.0.1",
                 },
@@ -1,13 +1,17 @@
-import os
-import tempfile
-
 import pytest
 
 from config import Config
 from core.llm.types import CompletionMessage, CompletionResponse
 
 
-@pytest.fixture
+PERSONA_YAML = b"""\
+name: "Test User"
+role: "Software Engineer"
+background: "Testing expert"
+"""
+
+
+@pytest.fixture(scope="session")
 def mock_env_vars():
     return {
         "LLM_PROVIDER": "openai",
@@ -18,29 +22,35 @@ def mock_env_vars():
     }
 
 
-@pytest.fixture
-def config(mock_env_vars, monkeypatch):
-    for key, value in mock_env_vars.items():
-        monkeypatch.setenv(key, value)
+@pytest.fixture(scope="session")
+def config(mock_env_vars):
+    # Config is a snapshot of the environment, so build it once and restore the
+    # environment straight away instead of leaking it into later tests.
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in mock_env_vars.items():
+            mp.setenv(key, value)
+
+        return Config.from_env()
+
 
-    return Config.from_env()
+# Frozen dataclasses, so every call can hand back the same response.
+MOCK_COMPLETION = CompletionResponse(
+    finish_reason="stop",
+    message=CompletionMessage(role="assistant", content="Mock LLM response", tool_calls=None),
+)
+
+
+class MockLLM:
+    async def complete(self, *, model: str, messages: list[dict], tools: list[dict] | None = None):
+        return MOCK_COMPLETION
+
+    @property
+    def capabilities(self):
+        return {"tools": True, "streaming": True}
 
 
 @pytest.fixture
 def mock_llm_provider():
-    class MockLLM:
-        async def complete(self, *, model: str, messages: list[dict], tools: list[dict] | None = None):
-            return CompletionResponse(
-                finish_reason="stop",
-                message=CompletionMessage(
-                    role="assistant", content="Mock LLM response", tool_calls=None
-                ),
-            )
-
-        @property
-        def capabilities(self):
-            return {"tools": True, "streaming": True}
-
     return MockLLM()
 
 
@@ -54,20 +64,10 @@ def sample_chat_history():
     ]
 
 
-@pytest.fixture
-def temp_persona_file():
-    temp_file = tempfile.NamedTemporaryFile(  # noqa: SIM115
-        mode="w", delete=False, suffix=".yaml"
-    )
-
-    yaml_content = """
-    name: "Test User"
-    role: "Software Engineer"
-    background: "Testing expert"
-    """
-    temp_file.write(yaml_content)
-    temp_file.close()
-
-    yield temp_file.name
-
-    os.unlink(temp_file.name)
+@pytest.fixture(scope="session")
+def temp_persona_file(tmp_path_factory):
+    # Consumers only read the file, so one copy serves the whole run.
+    persona_file = tmp_path_factory.mktemp("persona") / "persona.yaml"
+    persona_file.write_bytes(PERSONA_YAML)
+
+    return str(persona_file)
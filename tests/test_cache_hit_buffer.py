@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from repositories.cache_hit_buffer import CacheHitBuffer
+
+
+class TestRecord:
+    def test_coalesces_hits_per_entry(self):
+        buffer = CacheHitBuffer()
+        earlier = datetime(2026, 1, 1, 12, 0)
+        later = earlier + timedelta(seconds=5)
+
+        buffer.record(1, later)
+        buffer.record(1, earlier)
+        buffer.record(2, earlier)
+
+        assert len(buffer) == 2
+        assert buffer._pending[1] == (2, later)
+        assert buffer._pending[2] == (1, earlier)
+
+    def test_signals_when_full(self):
+        buffer = CacheHitBuffer(max_pending=2)
+
+        buffer.record(1, datetime.utcnow())
+        assert not buffer._full.is_set()
+
+        buffer.record(2, datetime.utcnow())
+        assert buffer._full.is_set()
+
+
+class TestFlush:
+    @pytest.mark.asyncio
+    async def test_writes_all_pending_in_one_statement(self):
+        buffer = CacheHitBuffer()
+        used_at = datetime(2026, 1, 1, 12, 0)
+        buffer.record(1, used_at)
+        buffer.record(1, used_at)
+        buffer.record(7, used_at)
+        session = AsyncMock()
+
+        flushed = await buffer.flush(session)
+
+        assert flushed == 2
+        assert len(buffer) == 0
+        session.execute.assert_called_once()
+        params = session.execute.call_args[0][1]
+        assert {"b_id": 1, "b_hits": 2, "b_used": used_at} in params
+        assert {"b_id": 7, "b_hits": 1, "b_used": used_at} in params
+        session.commit.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_bypasses_orm_bulk_update(self):
+        buffer = CacheHitBuffer()
+        buffer.record(1, datetime(2026, 1, 1, 12, 0))
+        session = AsyncMock()
+
+        await buffer.flush(session)
+
+        statement = session.execute.call_args[0][0]
+        assert statement.get_execution_options()["dml_strategy"] == "core_only"
+
+    @pytest.mark.asyncio
+    async def test_noop_when_empty(self):
+        session = AsyncMock()
+
+        flushed = await CacheHitBuffer().flush(session)
+
+        assert flushed == 0
+        session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_keeps_counts_when_write_fails(self):
+        buffer = CacheHitBuffer()
+        earlier = datetime(2026, 1, 1, 12, 0)
+        later = earlier + timedelta(seconds=5)
+        buffer.record(1, earlier)
+        buffer.record(1, earlier)
+        session = AsyncMock()
+
+        async def fail(*args):
+            buffer.record(1, later)
+            raise RuntimeError("connection lost")
+
+        session.execute.side_effect = fail
+
+        with pytest.raises(RuntimeError):
+            await buffer.flush(session)
+
+        assert buffer._pending == {1: (3, later)}
+        session.commit.assert_not_called()
@@ -1,10 +1,15 @@
 import json
+from collections import namedtuple
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from models.models import CachedAnswer
+from repositories import cache_repo
 from repositories.cache_repo import SQLAlchemyCacheRepository
+from repositories.pagination import decode_cursor, encode_cursor, total_counts
 
 
 class MockCachedAnswer:
@@ -14,9 +19,10 @@ class MockCachedAnswer:
         cache_key: str = "abc123",
         question: str = "What is Python?",
         context_preview: str | None = None,
-        tfidf_vector: str = "[0.5, 0.3]",
+        tfidf_vector: bytes = b"\x00\x38\xcd\x34",
         variations: str = '["Answer 1"]',
         variation_index: int = 0,
+        variation_count: int = 1,
         cache_type: str = "knowledge",
         expires_at: datetime | None = None,
         hit_count: int = 0,
@@ -30,12 +36,32 @@ class MockCachedAnswer:
         self.tfidf_vector = tfidf_vector
         self.variations = variations
         self.variation_index = variation_index
+        self.variation_count = variation_count
         self.cache_type = cache_type
         self.expires_at = expires_at
         self.hit_count = hit_count
         self.created_at = created_at or datetime.utcnow()
         self.last_used = last_used
 
+    def row(self, columns: tuple, **extra):
+        """Project onto ``columns`` (then ``extra``) the way a Core select returns it."""
+        keys = [column.key for column in columns]
+        Row = namedtuple("Row", [*keys, *extra])  # type: ignore[misc]
+        return Row(*(getattr(self, key) for key in keys), *extra.values())
+
+
+def assert_selects_columns_only(stmt):
+    assert all(d["expr"] is not CachedAnswer for d in stmt.column_descriptions)
+
+
+@pytest.fixture(autouse=True)
+def clear_key_cache():
+    cache_repo._key_cache.clear()
+    total_counts.clear()
+    yield
+    cache_repo._key_cache.clear()
+    total_counts.clear()
+
 
 @pytest.fixture
 def mock_session():
@@ -48,13 +74,36 @@ def repo(mock_session):
     return SQLAlchemyCacheRepository(mock_session)
 
 
+class TestRowBuilder:
+    def test_builds_dict_in_column_order_and_decodes_variations(self):
+        build = cache_repo._row_builder(
+            (CachedAnswer.id, CachedAnswer.variations, CachedAnswer.hit_count)
+        )
+
+        entry = build((7, '["A", "B"]', 3))
+
+        assert entry == {"id": 7, "variations": ["A", "B"], "hit_count": 3}
+        assert list(entry) == ["id", "variations", "hit_count"]
+
+    def test_ignores_trailing_columns(self):
+        build = cache_repo._row_builder((CachedAnswer.id, CachedAnswer.hit_count))
+
+        assert build((7, 3, 50)) == {"id": 7, "hit_count": 3}
+
+
+def mock_key_lookup(mock_session, cache):
+    result = MagicMock()
+    result.fetchone.return_value = cache.row(cache_repo._ENTRY_COLUMNS) if cache else None
+    connection = AsyncMock()
+    connection.exec_driver_sql.return_value = result
+    mock_session.connection.return_value = connection
+    return connection
+
+
 class TestGetCacheByKey:
     @pytest.mark.asyncio
     async def test_returns_dict_when_found(self, repo, mock_session):
-        mock_cache = MockCachedAnswer(id=1, cache_key="abc123")
-        mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_cache
-        mock_session.execute.return_value = mock_result
+        mock_key_lookup(mock_session, MockCachedAnswer(id=1, cache_key="abc123"))
 
         result = await repo.get_cache_by_key("abc123")
 
@@ -66,21 +115,98 @@ class TestGetCacheByKey:
 
     @pytest.mark.asyncio
     async def test_returns_none_when_not_found(self, repo, mock_session):
-        mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
-        mock_session.execute.return_value = mock_result
+        mock_key_lookup(mock_session, None)
 
         result = await repo.get_cache_by_key("nonexistent")
 
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_uses_driver_sql_not_orm(self, repo, mock_session):
+        connection = mock_key_lookup(mock_session, None)
+
+        await repo.get_cache_by_key("abc123")
+
+        sql, params = connection.exec_driver_sql.call_args.args
+        assert "WHERE cache_key = $1" in sql
+        assert params[0] == "abc123"
+        mock_session.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_served_from_memory(self, repo, mock_session):
+        connection = mock_key_lookup(mock_session, MockCachedAnswer(cache_key="abc123"))
+
+        first = await repo.get_cache_by_key("abc123")
+        second = await repo.get_cache_by_key("abc123")
+
+        assert first == second
+        assert connection.exec_driver_sql.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_hit_returns_independent_dicts(self, repo, mock_session):
+        mock_key_lookup(mock_session, MockCachedAnswer(cache_key="abc123"))
+
+        first = await repo.get_cache_by_key("abc123")
+        first["variations"].append("mutated")
+        first["question"] = "mutated"
+        second = await repo.get_cache_by_key("abc123")
+
+        assert second["question"] != "mutated"
+        assert "mutated" not in second["variations"]
+
+    @pytest.mark.asyncio
+    async def test_misses_are_not_cached(self, repo, mock_session):
+        connection = mock_key_lookup(mock_session, None)
+
+        await repo.get_cache_by_key("abc123")
+        await repo.get_cache_by_key("abc123")
+
+        assert connection.exec_driver_sql.call_count == 2
+        assert "abc123" not in cache_repo._key_cache
+
+    @pytest.mark.asyncio
+    async def test_delete_invalidates_cached_lookup(self, repo, mock_session):
+        connection = mock_key_lookup(mock_session, MockCachedAnswer(cache_key="abc123"))
+        mock_session.execute.return_value.rowcount = 1
+
+        await repo.get_cache_by_key("abc123")
+        await repo.delete_cache_by_id(1)
+        await repo.get_cache_by_key("abc123")
+
+        assert connection.exec_driver_sql.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_query_filters_expired_rows(self, repo, mock_session):
+        connection = mock_key_lookup(mock_session, None)
+
+        await repo.get_cache_by_key("abc123")
+
+        sql, params = connection.exec_driver_sql.call_args.args
+        assert "expires_at IS NULL OR expires_at > $2" in sql
+        assert isinstance(params[1], datetime)
+
+    @pytest.mark.asyncio
+    async def test_cached_entry_not_served_after_expiry(self, repo, mock_session):
+        mock_key_lookup(
+            mock_session,
+            MockCachedAnswer(
+                cache_key="abc123", expires_at=datetime.utcnow() - timedelta(seconds=1)
+            ),
+        )
+
+        await repo.get_cache_by_key("abc123")
+        result = await repo.get_cache_by_key("abc123")
+
+        assert result is None
+        assert "abc123" not in cache_repo._key_cache
+
 
 class TestGetCacheByQuestion:
     @pytest.mark.asyncio
     async def test_returns_dict_when_found(self, repo, mock_session):
         mock_cache = MockCachedAnswer(question="What is Python?")
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_cache
+        mock_result.one_or_none.return_value = mock_cache.row(cache_repo._ENTRY_COLUMNS)
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_cache_by_question("What is Python?")
@@ -91,7 +217,7 @@ class TestGetCacheByQuestion:
     @pytest.mark.asyncio
     async def test_returns_none_when_not_found(self, repo, mock_session):
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.one_or_none.return_value = None
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_cache_by_question("Unknown question")
@@ -103,11 +229,11 @@ class TestGetAllCachedQuestions:
     @pytest.mark.asyncio
     async def test_returns_list_of_dicts(self, repo, mock_session):
         mock_caches = [
-            MockCachedAnswer(id=1, question="Q1"),
-            MockCachedAnswer(id=2, question="Q2"),
+            MockCachedAnswer(id=1, question="Q1").row(cache_repo._SIMILARITY_COLUMNS),
+            MockCachedAnswer(id=2, question="Q2").row(cache_repo._SIMILARITY_COLUMNS),
         ]
         mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = mock_caches
+        mock_result.all.return_value = mock_caches
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_all_cached_questions()
@@ -119,35 +245,121 @@ class TestGetAllCachedQuestions:
     @pytest.mark.asyncio
     async def test_returns_empty_list_when_no_cache(self, repo, mock_session):
         mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = []
+        mock_result.all.return_value = []
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_all_cached_questions()
 
         assert result == []
 
+    @pytest.mark.asyncio
+    async def test_selects_columns_not_entities(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.all.return_value = []
+        mock_session.execute.return_value = mock_result
+
+        await repo.get_all_cached_questions()
+
+        assert_selects_columns_only(mock_session.execute.call_args.args[0])
+
+
+class TestGetCacheStats:
+    @pytest.mark.asyncio
+    async def test_aggregates_in_one_query(self, repo, mock_session):
+        row = MagicMock()
+        row._mapping = {"total_questions": 2, "total_variations": 3}
+        mock_result = MagicMock()
+        mock_result.one.return_value = row
+        mock_session.execute.return_value = mock_result
+
+        result = await repo.get_cache_stats()
+
+        assert result == {"total_questions": 2, "total_variations": 3}
+        mock_session.execute.assert_called_once()
+        sql = str(mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "sum(cached_answers.variation_count)" in sql
+        assert "FILTER (WHERE cached_answers.cache_type = " in sql
+        assert "GROUP BY" not in sql
+
 
 class TestCreateCache:
     @pytest.mark.asyncio
     async def test_creates_and_returns_id(self, repo, mock_session):
-        async def mock_refresh(obj):
-            obj.id = 42
-
-        mock_session.refresh = mock_refresh
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 42
+        mock_session.execute.return_value = mock_result
 
         result = await repo.create_cache(
             cache_key="abc123",
             question="What is Python?",
-            tfidf_vector="[0.5]",
+            tfidf_vector=b"\x00\x38",
             answer="A programming language",
             cache_type="knowledge",
             expires_at=datetime.utcnow() + timedelta(days=30),
         )
 
         assert result == 42
-        mock_session.add.assert_called_once()
+        mock_session.execute.assert_called_once()
         mock_session.commit.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_upserts_on_cache_key_conflict(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 7
+        mock_session.execute.return_value = mock_result
+
+        await repo.create_cache(
+            cache_key="abc123", question="What is Python?", tfidf_vector=b"\x00\x38", answer="A"
+        )
+
+        stmt = mock_session.execute.call_args[0][0]
+        compiled = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (cache_key) DO UPDATE" in compiled
+        assert "RETURNING cached_answers.id" in compiled
+
+    @pytest.mark.asyncio
+    async def test_conflict_restarts_expired_entry(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 7
+        mock_session.execute.return_value = mock_result
+
+        await repo.create_cache(
+            cache_key="abc123", question="What is Python?", tfidf_vector=b"\x00\x38", answer="A"
+        )
+
+        stmt = mock_session.execute.call_args[0][0]
+        compiled = str(stmt.compile(dialect=postgresql.dialect()))
+        for column in ("variations", "variation_count", "variation_index", "expires_at"):
+            assert f"{column} = CASE WHEN (cached_answers.expires_at < timezone(" in compiled
+            assert f"THEN excluded.{column} ELSE cached_answers.{column} END" in compiled
+
+    @pytest.mark.asyncio
+    async def test_does_not_refresh_after_insert(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 3
+        mock_session.execute.return_value = mock_result
+
+        await repo.create_cache(
+            cache_key="abc123", question="What is Python?", tfidf_vector=b"\x00\x38", answer="A"
+        )
+
+        mock_session.refresh.assert_not_called()
+        mock_session.add.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reuses_prebuilt_statement(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 1
+        mock_session.execute.return_value = mock_result
+
+        await repo.create_cache(cache_key="k1", question="Q1", tfidf_vector=b"", answer="A")
+        await repo.create_cache(cache_key="k2", question="Q2", tfidf_vector=b"", answer="B")
+
+        first, second = mock_session.execute.call_args_list
+        assert first.args[0] is second.args[0]
+        assert second.args[1]["cache_key"] == "k2"
+        assert second.args[1]["variations"] == '["B"]'
+
 
 class TestAddVariation:
     @pytest.mark.asyncio
@@ -160,6 +372,7 @@ class TestAddVariation:
         await repo.add_variation(1, "Answer 2")
 
         assert json.loads(mock_cache.variations) == ["Answer 1", "Answer 2"]
+        assert mock_cache.variation_count == 2
         mock_session.commit.assert_called_once()
 
     @pytest.mark.asyncio
@@ -182,45 +395,71 @@ class TestAddVariation:
         await repo.add_variation(999, "Answer")
 
 
+def rotated_row(variations: str, new_index: int) -> MagicMock:
+    row = MagicMock()
+    row.variations = variations
+    row.variation_index = new_index
+    return row
+
+
 class TestGetNextVariation:
     @pytest.mark.asyncio
     async def test_returns_current_and_rotates(self, repo, mock_session):
-        mock_cache = MockCachedAnswer(variations='["A", "B", "C"]', variation_index=0, hit_count=5)
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_cache
+        mock_result.one_or_none.return_value = rotated_row('["A", "B", "C"]', 1)
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_next_variation(1)
 
         assert result == "A"
-        assert mock_cache.variation_index == 1
-        assert mock_cache.hit_count == 6
+        stmt, params = mock_session.execute.call_args.args
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "variation_index=((cached_answers.variation_index + " in sql
+        assert "hit_count=(cached_answers.hit_count + " in sql
+        assert "last_used=timezone(" in sql
+        assert "RETURNING cached_answers.variations, cached_answers.variation_index" in sql
+        assert params["cache_id"] == 1
+        mock_session.execute.assert_called_once()
         mock_session.commit.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_defers_hit_counters_to_buffer(self, mock_session):
+        hit_buffer = MagicMock()
+        repo = SQLAlchemyCacheRepository(mock_session, hit_buffer=hit_buffer)
+        mock_result = MagicMock()
+        mock_result.one_or_none.return_value = rotated_row('["A", "B"]', 1)
+        mock_session.execute.return_value = mock_result
+
+        result = await repo.get_next_variation(1)
+
+        assert result == "A"
+        stmt = mock_session.execute.call_args.args[0]
+        assert "hit_count" not in str(stmt)
+        hit_buffer.record.assert_called_once()
+        assert hit_buffer.record.call_args[0][0] == 1
+
     @pytest.mark.asyncio
     async def test_wraps_around_at_end(self, repo, mock_session):
-        mock_cache = MockCachedAnswer(
-            variations='["A", "B", "C"]',
-            variation_index=2,
-        )
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_cache
+        mock_result.one_or_none.return_value = rotated_row('["A", "B", "C"]', 0)
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_next_variation(1)
 
         assert result == "C"
-        assert mock_cache.variation_index == 0
 
     @pytest.mark.asyncio
     async def test_returns_empty_when_not_found(self, repo, mock_session):
+        hit_buffer = MagicMock()
+        repo = SQLAlchemyCacheRepository(mock_session, hit_buffer=hit_buffer)
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.one_or_none.return_value = None
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_next_variation(999)
 
         assert result == ""
+        hit_buffer.record.assert_not_called()
 
 
 class TestDeleteExpired:
@@ -235,17 +474,52 @@ class TestDeleteExpired:
         assert result == 5
         mock_session.commit.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_deletes_in_batches_until_drained(self, repo, mock_session):
+        full, partial = MagicMock(), MagicMock()
+        full.rowcount = 2
+        partial.rowcount = 1
+        mock_session.execute.side_effect = [full, full, partial]
+
+        result = await repo.delete_expired(batch_size=2)
+
+        assert result == 5
+        assert mock_session.execute.call_count == 3
+        assert mock_session.commit.call_count == 3
+        assert mock_session.execute.call_args.args[1]["batch_size"] == 2
+
+    @pytest.mark.asyncio
+    async def test_each_batch_deletes_by_id_from_limited_subquery(self, repo, mock_session):
+        mock_session.execute.return_value.rowcount = 0
+
+        await repo.delete_expired()
+
+        sql = str(mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "DELETE FROM cached_answers WHERE cached_answers.id IN (SELECT" in sql
+        assert "cached_answers.expires_at < timezone(" in sql
+        assert "now())" in sql
+        assert "LIMIT" in sql
+
+    @pytest.mark.asyncio
+    async def test_binds_only_batch_size(self, repo, mock_session):
+        mock_session.execute.return_value.rowcount = 0
+
+        await repo.delete_expired(batch_size=50)
+
+        assert mock_session.execute.call_args.args[1] == {"batch_size": 50}
+
 
 class TestClearAllCache:
     @pytest.mark.asyncio
     async def test_returns_deleted_count(self, repo, mock_session):
         mock_result = MagicMock()
-        mock_result.rowcount = 100
+        mock_result.scalar.return_value = 100
         mock_session.execute.return_value = mock_result
 
         result = await repo.clear_all_cache()
 
         assert result == 100
+        assert str(mock_session.execute.call_args.args[0]) == "TRUNCATE TABLE cached_answers"
         mock_session.commit.assert_called_once()
 
 
@@ -311,23 +585,109 @@ class TestListCacheEntries:
     @pytest.mark.asyncio
     async def test_returns_paginated_results(self, repo, mock_session):
         mock_caches = [
-            MockCachedAnswer(id=1, question="Q1"),
-            MockCachedAnswer(id=2, question="Q2"),
+            MockCachedAnswer(id=1, question="Q1").row(cache_repo._LIST_COLUMNS, total=50),
+            MockCachedAnswer(id=2, question="Q2").row(cache_repo._LIST_COLUMNS, total=50),
         ]
 
-        count_result = MagicMock()
-        count_result.scalar.return_value = 50
-
         entries_result = MagicMock()
-        entries_result.scalars.return_value.all.return_value = mock_caches
-
-        mock_session.execute.side_effect = [count_result, entries_result]
+        entries_result.all.return_value = mock_caches
+        mock_session.execute.return_value = entries_result
 
         result = await repo.list_cache_entries(page=1, limit=20)
 
         assert result["total"] == 50
         assert result["page"] == 1
         assert len(result["entries"]) == 2
+        assert result["entries"][0]["variation_count"] == 1
+        assert "variations" not in result["entries"][0]
+        assert mock_session.execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_reuses_total_across_pages(self, repo, mock_session):
+        mock_cache = MockCachedAnswer().row(cache_repo._LIST_COLUMNS, total=50)
+        entries_result = MagicMock()
+        entries_result.all.return_value = [mock_cache]
+        mock_session.execute.return_value = entries_result
+
+        await repo.list_cache_entries(page=1, limit=20)
+        result = await repo.list_cache_entries(page=2, limit=20)
+
+        assert result["total"] == 50
+        sql = str(mock_session.execute.call_args.args[0])
+        assert "count(*) OVER" not in sql
+
+    @pytest.mark.asyncio
+    async def test_delete_drops_cached_total(self, repo, mock_session):
+        total_counts.set("cached_answers", 50)
+        mock_session.execute.return_value.rowcount = 1
+
+        await repo.delete_cache_by_id(1)
+
+        assert "cached_answers" not in total_counts
+
+    @pytest.mark.asyncio
+    async def test_decodes_variations_only_on_request(self, repo, mock_session):
+        mock_cache = MockCachedAnswer(variations='["A1", "A2"]', variation_count=2).row(
+            cache_repo._LIST_WITH_VARIATIONS_COLUMNS, total=1
+        )
+        entries_result = MagicMock()
+        entries_result.all.return_value = [mock_cache]
+        mock_session.execute.return_value = entries_result
+
+        result = await repo.list_cache_entries(include_variations=True)
+
+        assert result["entries"][0]["variations"] == ["A1", "A2"]
+        assert result["entries"][0]["variation_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_counts_separately_when_page_is_past_the_end(self, repo, mock_session):
+        entries_result = MagicMock()
+        entries_result.all.return_value = []
+
+        count_result = MagicMock()
+        count_result.scalar.return_value = 5
+
+        mock_session.execute.side_effect = [entries_result, count_result]
+
+        result = await repo.list_cache_entries(page=3, limit=20)
+
+        assert result["total"] == 5
+        assert result["entries"] == []
+        assert result["total_pages"] == 1
+
+    @pytest.mark.asyncio
+    async def test_returns_next_cursor_when_more_rows(self, repo, mock_session):
+        used = datetime(2026, 1, 1, 12, 0)
+        mock_caches = [
+            MockCachedAnswer(id=i, last_used=used).row(cache_repo._LIST_COLUMNS, total=3)
+            for i in (3, 2, 1)
+        ]
+
+        entries_result = MagicMock()
+        entries_result.all.return_value = mock_caches
+        mock_session.execute.return_value = entries_result
+
+        result = await repo.list_cache_entries(page=1, limit=2)
+
+        assert [e["id"] for e in result["entries"]] == [3, 2]
+        assert decode_cursor(result["next_cursor"], CachedAnswer.last_used) == (used, 2)
+
+    @pytest.mark.asyncio
+    async def test_cursor_seeks_without_offset_or_count(self, repo, mock_session):
+        entries_result = MagicMock()
+        entries_result.all.return_value = [MockCachedAnswer(id=1).row(cache_repo._LIST_COLUMNS)]
+        mock_session.execute.return_value = entries_result
+
+        cursor = encode_cursor(datetime(2026, 1, 1, 12, 0), 2)
+        result = await repo.list_cache_entries(limit=2, cursor=cursor)
+
+        sql = str(mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "OFFSET" not in sql
+        assert "count(*) OVER" not in sql
+        assert "(cached_answers.last_used, cached_answers.id) <" in sql
+        assert result["total"] is None
+        assert result["next_cursor"] is None
+        assert mock_session.execute.call_count == 1
 
 
 class TestGetCacheById:
@@ -335,7 +695,7 @@ class TestGetCacheById:
     async def test_returns_dict_when_found(self, repo, mock_session):
         mock_cache = MockCachedAnswer(id=1, question="Test?")
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_cache
+        mock_result.one_or_none.return_value = mock_cache.row(cache_repo._ENTRY_COLUMNS)
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_cache_by_id(1)
@@ -347,7 +707,7 @@ class TestGetCacheById:
     @pytest.mark.asyncio
     async def test_returns_none_when_not_found(self, repo, mock_session):
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.one_or_none.return_value = None
         mock_session.execute.return_value = mock_result
 
         result = await repo.get_cache_by_id(999)
@@ -358,12 +718,39 @@ class TestGetCacheById:
 class TestSearchCache:
     @pytest.mark.asyncio
     async def test_returns_matching_entries(self, repo, mock_session):
-        mock_caches = [MockCachedAnswer(id=1, question="Python question")]
+        mock_caches = [
+            MockCachedAnswer(id=1, question="Python question").row(cache_repo._SEARCH_COLUMNS)
+        ]
         mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = mock_caches
+        mock_result.all.return_value = mock_caches
         mock_session.execute.return_value = mock_result
 
         result = await repo.search_cache("python", limit=10)
 
         assert len(result) == 1
         assert result[0]["question"] == "Python question"
+
+    @pytest.mark.asyncio
+    async def test_selects_columns_not_entities(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.all.return_value = []
+        mock_session.execute.return_value = mock_result
+
+        await repo.search_cache("python")
+
+        stmt = mock_session.execute.call_args.args[0]
+        assert_selects_columns_only(stmt)
+        assert "tfidf_vector" not in str(stmt)
+
+    @pytest.mark.asyncio
+    async def test_escapes_like_wildcards_in_query(self, repo, mock_session):
+        mock_result = MagicMock()
+        mock_result.all.return_value = []
+        mock_session.execute.return_value = mock_result
+
+        await repo.search_cache("100%_done")
+
+        compiled = mock_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        assert "ILIKE" in str(compiled)
+        assert "ESCAPE '/'" in str(compiled)
+        assert "100/%/_done" in compiled.params.values()
@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
 
@@ -6,6 +7,7 @@ import pytest
 from services.cache_service import (
     CACHE_DENYLIST,
     CACHE_TTL,
+    MIN_TOKENS_FOR_CACHE,
     CacheService,
     CacheType,
 )
@@ -50,6 +52,9 @@ class TestShouldSkipCache:
             if word in CACHE_DENYLIST:
                 assert service.should_skip_cache(word, is_continuation=True) is True
 
+    def test_denylist_phrases_fall_below_token_floor(self):
+        assert all(len(phrase.split()) < MIN_TOKENS_FOR_CACHE for phrase in CACHE_DENYLIST)
+
     def test_short_messages_below_threshold_skipped(self, service):
         assert service.should_skip_cache("do it now") is True
         assert service.should_skip_cache("tell me about Python programming") is False
@@ -128,6 +133,12 @@ class TestBuildCacheKey:
 
         assert key1 == key2
 
+    def test_key_matches_joined_persona_context_message(self, service):
+        key = service.build_cache_key("What is Python?", last_assistant_message="Hi there")
+        expected = hashlib.sha256(b"test_hash||Hi there||What is Python?").hexdigest()
+
+        assert key == expected
+
     def test_different_persona_hash_different_key(self):
         mock_repo = MagicMock()
         mock_similarity = MagicMock()
@@ -168,17 +179,13 @@ class TestGetCachedAnswer:
         service.cache_repo.get_next_variation.assert_called_once_with(1)
 
     @pytest.mark.asyncio
-    async def test_deletes_expired_exact_match(self, service):
-        service.cache_repo.get_cache_by_key.return_value = {
-            "id": 1,
-            "expires_at": datetime.utcnow() - timedelta(days=1),
-        }
-        service.cache_repo.get_all_cached_questions.return_value = []
+    async def test_miss_is_a_single_lookup_without_inline_delete(self, service):
+        service.cache_repo.get_cache_by_key.return_value = None
 
-        result = await service.get_cached_answer("What is Python?")
+        await service.get_cached_answer("What is Python?")
 
-        service.cache_repo.delete_cache_by_id.assert_called_once_with(1)
-        assert result is None
+        assert [c[0] for c in service.cache_repo.method_calls] == ["get_cache_by_key"]
+        service.cache_repo.delete_cache_by_id.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_returns_none_when_no_cache(self, service):
@@ -290,6 +297,16 @@ class TestCacheAnswer:
         assert result == 42
         service.cache_repo.create_cache.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_creates_cache_with_cache_type(self, service):
+        service.cache_repo.get_cache_by_key.return_value = None
+        service.cache_repo.create_cache.return_value = 1
+
+        await service.cache_answer("Can you tell me more?", "Sure.", is_continuation=True)
+
+        call_kwargs = service.cache_repo.create_cache.call_args[1]
+        assert call_kwargs["cache_type"] == "conversational"
+
     @pytest.mark.asyncio
     async def test_creates_cache_with_context_preview(self, service):
         service.cache_repo.get_cache_by_key.return_value = None
@@ -316,30 +333,32 @@ class TestCacheStats:
 
     @pytest.mark.asyncio
     async def test_returns_stats_dict(self, service):
-        service.cache_repo.get_all_cached_questions.return_value = [
-            {
-                "cache_type": "knowledge",
-                "expires_at": datetime.utcnow() + timedelta(days=1),
-                "variations": ["a", "b"],
-            },
-            {
-                "cache_type": "conversational",
-                "expires_at": datetime.utcnow() - timedelta(days=1),
-                "variations": ["c"],
-            },
-        ]
+        service.cache_repo.get_cache_stats.return_value = {
+            "total_questions": 2,
+            "total_variations": 3,
+            "knowledge_entries": 1,
+            "conversational_entries": 1,
+            "expired_entries": 1,
+        }
 
         stats = await service.get_cache_stats()
 
         assert stats["total_questions"] == 2
         assert stats["total_variations"] == 3
+        assert stats["avg_variations_per_question"] == 1.5
         assert stats["knowledge_entries"] == 1
         assert stats["conversational_entries"] == 1
         assert stats["expired_entries"] == 1
 
     @pytest.mark.asyncio
     async def test_handles_empty_cache(self, service):
-        service.cache_repo.get_all_cached_questions.return_value = []
+        service.cache_repo.get_cache_stats.return_value = {
+            "total_questions": 0,
+            "total_variations": 0,
+            "knowledge_entries": 0,
+            "conversational_entries": 0,
+            "expired_entries": 0,
+        }
 
         stats = await service.get_cache_stats()
 
@@ -379,7 +398,9 @@ class TestAdminMethods:
         result = await service.list_cache_entries(page=2, limit=15)
 
         assert result == {"entries": [], "total": 0}
-        service.cache_repo.list_cache_entries.assert_called_once_with(2, 15, "last_used", "desc")
+        service.cache_repo.list_cache_entries.assert_called_once_with(
+            2, 15, "last_used", "desc", None, False
+        )
 
     @pytest.mark.asyncio
     async def test_get_cache_by_id_delegates(self, service):
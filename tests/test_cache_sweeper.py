@@ -0,0 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from repositories import cache_sweeper
+
+
+class TestSweepExpiredCache:
+    @pytest.mark.asyncio
+    async def test_deletes_expired_each_interval_and_survives_errors(self):
+        session = AsyncMock()
+        result = MagicMock()
+        result.rowcount = 3
+        session.execute.side_effect = [RuntimeError("db down"), result, result]
+        sessions = 0
+
+        @asynccontextmanager
+        async def fake_get_session(config):
+            nonlocal sessions
+            sessions += 1
+            yield session
+
+        with patch.object(cache_sweeper, "get_session", fake_get_session):
+            task = asyncio.create_task(cache_sweeper.sweep_expired_cache(MagicMock(), 0))
+            while sessions < 3:
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert session.execute.call_count >= 2
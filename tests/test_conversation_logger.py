@@ -168,7 +168,9 @@ class TestAdminMethods:
         result = await logger.list_sessions(page=1, limit=10)
 
         assert result == {"sessions": [], "total": 0}
-        mock_conversation_repo.list_sessions.assert_called_once_with(1, 10, "created_at", "desc")
+        mock_conversation_repo.list_sessions.assert_called_once_with(
+            1, 10, "created_at", "desc", None
+        )
 
     @pytest.mark.asyncio
     async def test_list_cache_entries(self, logger, mock_cache_service):
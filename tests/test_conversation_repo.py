@@ -1,10 +1,14 @@
 import json
+from collections import namedtuple
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
+from models.models import Session
 from repositories.conversation_repo import SQLAlchemyConversationRepository
+from repositories.pagination import decode_cursor, encode_cursor, total_counts
 
 
 class MockSession:
@@ -47,6 +51,17 @@ class MockConversation:
         self.timestamp = timestamp or datetime.utcnow()
 
 
+# First-page rows carry the window count, which the repository reads by name.
+CountedSessionRow = namedtuple("CountedSessionRow", ["Session", "message_count", "total"])
+
+
+@pytest.fixture(autouse=True)
+def clear_total_counts():
+    total_counts.clear()
+    yield
+    total_counts.clear()
+
+
 @pytest.fixture
 def mock_db_session():
     session = AsyncMock()
@@ -60,71 +75,95 @@ def repo(mock_db_session):
 
 class TestCreateSession:
     @pytest.mark.asyncio
-    async def test_returns_existing_session_id(self, repo, mock_db_session):
-        mock_session = MockSession(id=42, session_id="sess_abc")
+    async def test_returns_new_session_id_in_one_statement(self, repo, mock_db_session):
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_session
+        mock_result.scalar_one_or_none.return_value = 42
         mock_db_session.execute.return_value = mock_result
 
         result = await repo.create_session("sess_abc", "192.168.1.1")
 
         assert result == 42
+        mock_db_session.execute.assert_called_once()
         mock_db_session.add.assert_not_called()
+        mock_db_session.commit.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_creates_new_session_when_not_exists(self, repo, mock_db_session):
+    async def test_leaves_existing_session_untouched(self, repo, mock_db_session):
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.scalar_one_or_none.return_value = 1
         mock_db_session.execute.return_value = mock_result
 
-        async def mock_refresh(obj):
-            obj.id = 99
+        await repo.create_session("sess_123", None)
 
-        mock_db_session.refresh = mock_refresh
+        stmt = mock_db_session.execute.call_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (session_id) DO NOTHING" in sql
+        assert "RETURNING session.id" in sql
+        assert "last_activity" not in sql.split("ON CONFLICT")[1]
 
-        result = await repo.create_session("new_sess", "10.0.0.1")
+    @pytest.mark.asyncio
+    async def test_looks_up_existing_session_id(self, repo, mock_db_session):
+        insert_result = MagicMock()
+        insert_result.scalar_one_or_none.return_value = None
+        select_result = MagicMock()
+        select_result.scalar_one.return_value = 7
+        mock_db_session.execute.side_effect = [insert_result, select_result]
 
-        assert result == 99
-        mock_db_session.add.assert_called_once()
-        mock_db_session.commit.assert_called_once()
+        result = await repo.create_session("sess_123", "10.0.0.1")
+
+        assert result == 7
+        lookup = mock_db_session.execute.call_args_list[1]
+        assert lookup.args[1] == {"session_id": "sess_123"}
+        assert "FROM session" in str(lookup.args[0])
 
     @pytest.mark.asyncio
-    async def test_handles_none_user_ip(self, repo, mock_db_session):
+    async def test_reuses_prebuilt_statement(self, repo, mock_db_session):
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.scalar_one_or_none.return_value = 1
         mock_db_session.execute.return_value = mock_result
 
-        async def mock_refresh(obj):
-            obj.id = 1
-
-        mock_db_session.refresh = mock_refresh
+        await repo.create_session("sess_a", None)
+        await repo.create_session("sess_b", "10.0.0.1")
 
-        result = await repo.create_session("sess_123", None)
-        assert result == 1
+        first, second = mock_db_session.execute.call_args_list
+        assert first.args[0] is second.args[0]
+        assert second.args[1] == {"session_id": "sess_b", "user_ip": "10.0.0.1"}
 
 
 class TestLogConversation:
     @pytest.mark.asyncio
     async def test_logs_basic_conversation(self, repo, mock_db_session):
-        async def mock_refresh(obj):
-            obj.id = 55
-
-        mock_db_session.refresh = mock_refresh
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 55
+        mock_db_session.execute.return_value = mock_result
 
         result = await repo.log_conversation(
             session_db_id=1, user_message="What is Python?", bot_response="A programming language"
         )
 
         assert result == 55
-        mock_db_session.add.assert_called_once()
+        assert mock_db_session.execute.call_count == 2
+        mock_db_session.add.assert_not_called()
+        mock_db_session.refresh.assert_not_called()
         mock_db_session.commit.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_logs_with_tool_calls(self, repo, mock_db_session):
-        async def mock_refresh(obj):
-            obj.id = 1
+    async def test_inserts_with_returning(self, repo, mock_db_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 1
+        mock_db_session.execute.return_value = mock_result
+
+        await repo.log_conversation(session_db_id=1, user_message="Hi", bot_response="Hello")
 
-        mock_db_session.refresh = mock_refresh
+        stmt = mock_db_session.execute.call_args_list[0].args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "RETURNING conversations.id" in sql
+
+    @pytest.mark.asyncio
+    async def test_logs_with_tool_calls(self, repo, mock_db_session):
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 1
+        mock_db_session.execute.return_value = mock_result
 
         await repo.log_conversation(
             session_db_id=1,
@@ -133,17 +172,16 @@ class TestLogConversation:
             tool_calls=[{"name": "record_user_details", "args": {"email": "test@example.com"}}],
         )
 
-        call_args = mock_db_session.add.call_args[0][0]
-        assert call_args.tool_calls is not None
-        parsed = json.loads(call_args.tool_calls)
+        params = mock_db_session.execute.call_args_list[0].args[1]
+        assert params["tool_calls"] is not None
+        parsed = json.loads(params["tool_calls"])
         assert parsed[0]["name"] == "record_user_details"
 
     @pytest.mark.asyncio
     async def test_logs_with_evaluator_info(self, repo, mock_db_session):
-        async def mock_refresh(obj):
-            obj.id = 1
-
-        mock_db_session.refresh = mock_refresh
+        mock_result = MagicMock()
+        mock_result.scalar_one.return_value = 1
+        mock_db_session.execute.return_value = mock_result
 
         await repo.log_conversation(
             session_db_id=1,
@@ -153,9 +191,25 @@ class TestLogConversation:
             evaluator_passed=False,
         )
 
-        call_args = mock_db_session.add.call_args[0][0]
-        assert call_args.evaluator_used is True
-        assert call_args.evaluator_passed is False
+        params = mock_db_session.execute.call_args_list[0].args[1]
+        assert params["evaluator_used"] is True
+        assert params["evaluator_passed"] is False
+
+    @pytest.mark.asyncio
+    async def test_hands_off_to_running_writer(self, mock_db_session):
+        writer = MagicMock()
+        writer.running = True
+        writer.submit = AsyncMock(return_value=77)
+        repo = SQLAlchemyConversationRepository(mock_db_session, writer=writer)
+
+        result = await repo.log_conversation(
+            session_db_id=1, user_message="Hi", bot_response="Hello", tool_calls=[{"a": 1}]
+        )
+
+        assert result == 77
+        assert writer.submit.call_args.args[0]["tool_calls"] == '[{"a":1}]'
+        mock_db_session.add.assert_not_called()
+        mock_db_session.commit.assert_not_called()
 
 
 class TestGetSessionById:
@@ -194,18 +248,15 @@ class TestGetSessionById:
 class TestListSessions:
     @pytest.mark.asyncio
     async def test_returns_paginated_results(self, repo, mock_db_session):
-        mock_sessions = [
-            MockSession(id=1, session_id="s1", conversations=[MockConversation()]),
-            MockSession(id=2, session_id="s2", conversations=[]),
+        mock_rows = [
+            CountedSessionRow(MockSession(id=1, session_id="s1"), 1, 50),
+            CountedSessionRow(MockSession(id=2, session_id="s2"), 0, 50),
         ]
 
-        count_result = MagicMock()
-        count_result.scalar.return_value = 50
-
         sessions_result = MagicMock()
-        sessions_result.scalars.return_value.all.return_value = mock_sessions
+        sessions_result.all.return_value = mock_rows
 
-        mock_db_session.execute.side_effect = [count_result, sessions_result]
+        mock_db_session.execute.return_value = sessions_result
 
         result = await repo.list_sessions(page=1, limit=20)
 
@@ -215,30 +266,54 @@ class TestListSessions:
         assert result["total_pages"] == 3
         assert len(result["sessions"]) == 2
         assert result["sessions"][0]["message_count"] == 1
+        assert result["sessions"][1]["message_count"] == 0
 
     @pytest.mark.asyncio
-    async def test_calculates_offset_correctly(self, repo, mock_db_session):
-        count_result = MagicMock()
-        count_result.scalar.return_value = 100
+    async def test_counts_total_with_window_in_page_query(self, repo, mock_db_session):
+        sessions_result = MagicMock()
+        sessions_result.all.return_value = []
+        mock_db_session.execute.return_value = sessions_result
+
+        await repo.list_sessions()
 
+        assert mock_db_session.execute.call_count == 1
+        sql = str(mock_db_session.execute.call_args.args[0])
+        assert "count(*) OVER ()" in sql
+
+    @pytest.mark.asyncio
+    async def test_counts_messages_in_sql(self, repo, mock_db_session):
         sessions_result = MagicMock()
-        sessions_result.scalars.return_value.all.return_value = []
+        sessions_result.all.return_value = []
+        mock_db_session.execute.return_value = sessions_result
+
+        await repo.list_sessions()
+
+        sql = str(mock_db_session.execute.call_args.args[0])
+        assert "count(*)" in sql
+        assert "conversations.session_id = session.id" in sql
+
+    @pytest.mark.asyncio
+    async def test_counts_separately_past_last_page(self, repo, mock_db_session):
+        sessions_result = MagicMock()
+        sessions_result.all.return_value = []
+
+        count_result = MagicMock()
+        count_result.scalar.return_value = 100
 
-        mock_db_session.execute.side_effect = [count_result, sessions_result]
+        mock_db_session.execute.side_effect = [sessions_result, count_result]
 
-        await repo.list_sessions(page=3, limit=20)
+        result = await repo.list_sessions(page=9, limit=20)
 
         assert mock_db_session.execute.call_count == 2
+        assert result["total"] == 100
+        assert result["sessions"] == []
 
     @pytest.mark.asyncio
     async def test_handles_empty_database(self, repo, mock_db_session):
-        count_result = MagicMock()
-        count_result.scalar.return_value = 0
-
         sessions_result = MagicMock()
-        sessions_result.scalars.return_value.all.return_value = []
+        sessions_result.all.return_value = []
 
-        mock_db_session.execute.side_effect = [count_result, sessions_result]
+        mock_db_session.execute.return_value = sessions_result
 
         result = await repo.list_sessions()
 
@@ -246,6 +321,42 @@ class TestListSessions:
         assert result["total_pages"] == 0
         assert result["sessions"] == []
 
+    @pytest.mark.asyncio
+    async def test_reuses_cached_total(self, repo, mock_db_session):
+        first_page = MagicMock()
+        first_page.all.return_value = [CountedSessionRow(MockSession(id=1, session_id="s1"), 0, 40)]
+        second_page = MagicMock()
+        second_page.all.return_value = [(MockSession(id=2, session_id="s2"), 0)]
+        mock_db_session.execute.side_effect = [first_page, second_page]
+
+        await repo.list_sessions(page=1)
+        result = await repo.list_sessions(page=2)
+
+        assert result["total"] == 40
+        assert mock_db_session.execute.call_count == 2
+        assert "OVER" not in str(mock_db_session.execute.call_args.args[0])
+
+    @pytest.mark.asyncio
+    async def test_cursor_skips_count_and_returns_next_cursor(self, repo, mock_db_session):
+        created = datetime(2026, 1, 1, 12, 0)
+        sessions_result = MagicMock()
+        sessions_result.all.return_value = [
+            (MockSession(id=i, session_id=f"s{i}", created_at=created), 0) for i in (4, 3, 2)
+        ]
+        mock_db_session.execute.return_value = sessions_result
+
+        result = await repo.list_sessions(limit=2, cursor=encode_cursor(created, 5))
+
+        assert mock_db_session.execute.call_count == 1
+        assert result["total"] is None
+        assert [s["id"] for s in result["sessions"]] == [4, 3]
+        assert decode_cursor(result["next_cursor"], Session.created_at) == (created, 3)
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_cursor(self, repo):
+        with pytest.raises(ValueError):
+            await repo.list_sessions(cursor="garbage")
+
 
 class TestDeleteSession:
     @pytest.mark.asyncio
@@ -286,11 +397,13 @@ class TestClearAllSessions:
         mock_db_session.commit.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_deletes_conversations_before_sessions(self, repo, mock_db_session):
+    async def test_truncates_conversations_with_sessions(self, repo, mock_db_session):
         count_result = MagicMock()
         count_result.scalar.return_value = 5
         mock_db_session.execute.return_value = count_result
 
         await repo.clear_all_sessions()
 
-        assert mock_db_session.execute.call_count == 3
+        assert mock_db_session.execute.call_count == 2
+        statement = str(mock_db_session.execute.call_args.args[0])
+        assert statement == "TRUNCATE TABLE conversations, session"
@@ -0,0 +1,150 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from repositories import conversation_writer as writer_module
+from repositories.conversation_writer import ConversationWriter
+
+
+def _params(session_id: int = 1, message: str = "Hello") -> dict:
+    return {
+        "session_id": session_id,
+        "user_message": message,
+        "bot_response": "Hi",
+        "tool_calls": None,
+        "evaluator_used": False,
+        "evaluator_passed": None,
+    }
+
+
+def _session_returning(*ids: int) -> AsyncMock:
+    session = AsyncMock()
+    insert_result = MagicMock()
+    insert_result.scalars.return_value.all.return_value = list(ids)
+    session.execute.side_effect = [insert_result, MagicMock()]
+    return session
+
+
+class TestWrite:
+    @pytest.mark.asyncio
+    async def test_inserts_batch_and_resolves_futures_in_order(self):
+        loop = asyncio.get_running_loop()
+        batch = [(_params(1, "a"), loop.create_future()), (_params(2, "b"), loop.create_future())]
+        session = _session_returning(10, 11)
+
+        await ConversationWriter().write(session, batch)
+
+        insert_params = session.execute.call_args_list[0].args[1]
+        assert [p["user_message"] for p in insert_params] == ["a", "b"]
+        assert [future.result() for _, future in batch] == [10, 11]
+        session.commit.assert_called_once()
+
+
+class TestRun:
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_submissions(self):
+        writer = ConversationWriter(window=0.05)
+        session = _session_returning(1, 2, 3)
+
+        @asynccontextmanager
+        async def fake_get_session(config):
+            yield session
+
+        with patch.object(writer_module, "get_session", fake_get_session):
+            task = asyncio.create_task(writer.run(MagicMock()))
+            await asyncio.sleep(0)
+            ids = await asyncio.gather(*(writer.submit(_params(message=m)) for m in "xyz"))
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert ids == [1, 2, 3]
+        session.commit.assert_called_once()
+        assert not writer.running
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_raises_to_submitters(self):
+        writer = ConversationWriter(window=0)
+        session = AsyncMock()
+        session.execute.side_effect = RuntimeError("db down")
+
+        @asynccontextmanager
+        async def fake_get_session(config):
+            yield session
+
+        with patch.object(writer_module, "get_session", fake_get_session):
+            task = asyncio.create_task(writer.run(MagicMock()))
+            await asyncio.sleep(0)
+            with pytest.raises(RuntimeError, match="db down"):
+                await writer.submit(_params())
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retries_rows_individually(self):
+        writer = ConversationWriter(window=0.05)
+        next_id = iter(range(1, 10))
+
+        async def execute(statement, params=None):
+            if isinstance(params, list):
+                if any(p["user_message"] == "bad" for p in params):
+                    raise RuntimeError("fk violation")
+                result = MagicMock()
+                result.scalars.return_value.all.return_value = [next(next_id) for _ in params]
+                return result
+            return MagicMock()
+
+        session = AsyncMock()
+        session.execute.side_effect = execute
+
+        @asynccontextmanager
+        async def fake_get_session(config):
+            yield session
+
+        with patch.object(writer_module, "get_session", fake_get_session):
+            task = asyncio.create_task(writer.run(MagicMock()))
+            await asyncio.sleep(0)
+            good, bad = await asyncio.gather(
+                writer.submit(_params(message="good")),
+                writer.submit(_params(message="bad")),
+                return_exceptions=True,
+            )
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert good == 1
+        assert isinstance(bad, RuntimeError)
+
+    @pytest.mark.asyncio
+    async def test_cancel_mid_write_still_resolves_batch(self):
+        writer = ConversationWriter(window=0)
+        session = _session_returning(5)
+        write_started = asyncio.Event()
+        release_write = asyncio.Event()
+
+        async def slow_commit():
+            write_started.set()
+            await release_write.wait()
+
+        session.commit.side_effect = slow_commit
+
+        @asynccontextmanager
+        async def fake_get_session(config):
+            yield session
+
+        with patch.object(writer_module, "get_session", fake_get_session):
+            task = asyncio.create_task(writer.run(MagicMock()))
+            await asyncio.sleep(0)
+            submitted = asyncio.create_task(writer.submit(_params()))
+            await write_started.wait()
+            task.cancel()
+            await asyncio.sleep(0)
+            release_write.set()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert await asyncio.wait_for(submitted, timeout=1) == 5
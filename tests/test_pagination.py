@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.models import CachedAnswer, Session
+from repositories.pagination import decode_cursor, encode_cursor, seek_after
+
+
+def _sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+
+class TestCursorEncoding:
+    def test_round_trips_datetime(self):
+        used = datetime(2026, 1, 1, 12, 30, 15, 250)
+
+        cursor = encode_cursor(used, 42)
+
+        assert decode_cursor(cursor, CachedAnswer.last_used) == (used, 42)
+
+    def test_round_trips_int_and_null(self):
+        assert decode_cursor(encode_cursor(7, 3), CachedAnswer.hit_count) == (7, 3)
+        assert decode_cursor(encode_cursor(None, 3), CachedAnswer.expires_at) == (None, 3)
+
+    @pytest.mark.parametrize(
+        "cursor",
+        ["not-base64!", encode_cursor(1, "x"), "W10="],  # type: ignore[arg-type]
+    )
+    def test_rejects_malformed_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, CachedAnswer.hit_count)
+
+    @pytest.mark.parametrize(
+        ("value", "sort_col"),
+        [
+            ("2026-01-01T12:00:00", CachedAnswer.hit_count),
+            (True, CachedAnswer.hit_count),
+            (7, CachedAnswer.last_used),
+            ("yesterday", Session.last_activity),
+            (7, CachedAnswer.cache_type),
+            (None, CachedAnswer.created_at),
+        ],
+    )
+    def test_rejects_value_of_wrong_type_for_sort_column(self, value, sort_col):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(value, 3), sort_col)
+
+
+class TestSeekAfter:
+    def test_descending_uses_row_comparison(self):
+        clause = seek_after(Session.created_at, Session.id, datetime(2026, 1, 1), 5, True)
+
+        assert _sql(clause).startswith("(session.created_at, session.id) <")
+        assert "IS NULL" not in _sql(clause)
+
+    def test_nullable_column_keeps_null_tail(self):
+        expires = datetime(2026, 1, 1)
+        clause = seek_after(CachedAnswer.expires_at, CachedAnswer.id, expires, 5, False)
+
+        assert "(cached_answers.expires_at, cached_answers.id) >" in _sql(clause)
+        assert "cached_answers.expires_at IS NULL" in _sql(clause)
+
+    def test_null_cursor_stays_in_null_tail(self):
+        clause = seek_after(CachedAnswer.expires_at, CachedAnswer.id, None, 5, True)
+
+        assert "cached_answers.expires_at IS NULL AND cached_answers.id <" in _sql(clause)
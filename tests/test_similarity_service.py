@@ -1,9 +1,9 @@
-import json
+from unittest.mock import patch
 
 import numpy as np
 import pytest
 
-from services.similarity_service import SimilarityService
+from services.similarity_service import VECTOR_DTYPE, SimilarityService
 
 
 class TestSimilarityServiceInit:
@@ -23,41 +23,43 @@ class TestSimilarityServiceInit:
 
 class TestVectorize:
 
-    def test_vectorize_returns_json_string(self):
+    def test_vectorize_returns_half_precision_bytes(self):
         service = SimilarityService()
         result = service.vectorize("What is Python?")
 
-        assert isinstance(result, str)
-        parsed = json.loads(result)
-        assert isinstance(parsed, list)
+        assert isinstance(result, bytes)
+        assert len(result) % np.dtype(VECTOR_DTYPE).itemsize == 0
 
-    def test_vectorize_fits_on_first_call(self):
+    def test_vectorize_does_not_keep_single_question_vocabulary(self):
         service = SimilarityService()
-        assert service._is_fitted is False
 
         service.vectorize("What is Python?")
+        result = service.deserialize_vector(service.vectorize("How do I cook pasta?"))
 
-        assert service._is_fitted is True
+        assert service._is_fitted is False
+        assert result.any()
 
-    def test_vectorize_subsequent_calls_use_transform(self):
+    def test_vectorize_after_corpus_fit_uses_transform(self):
         service = SimilarityService()
-        service.vectorize("What is Python?")
+        service.fit_on_corpus(["What is Python?", "How do I cook pasta?"])
+
+        first = service.vectorize("What is Python?")
+        second = service.vectorize("How do I learn Python?")
 
-        result = service.vectorize("How do I learn Python?")
-        assert isinstance(result, str)
         assert service._is_fitted is True
+        assert len(first) == len(second)
 
 
 class TestDeserializeVector:
 
     def test_deserialize_returns_numpy_array(self):
         service = SimilarityService()
-        json_vector = json.dumps([0.5, 0.3, 0.2])
+        vector_bytes = np.array([0.5, 0.25, 0.125], dtype=VECTOR_DTYPE).tobytes()
 
-        result = service.deserialize_vector(json_vector)
+        result = service.deserialize_vector(vector_bytes)
 
         assert isinstance(result, np.ndarray)
-        assert list(result) == [0.5, 0.3, 0.2]
+        assert list(result) == [0.5, 0.25, 0.125]
 
 
 class TestCalculateSimilarity:
@@ -102,9 +104,9 @@ class TestFindBestMatch:
         service = SimilarityService(threshold=0.5)
 
         question = "What is Python programming?"
-        vector_json = service.vectorize(question)
+        vector_bytes = service.vectorize(question)
 
-        cached_questions = [{"id": 1, "question": question, "tfidf_vector": vector_json}]
+        cached_questions = [{"id": 1, "question": question, "tfidf_vector": vector_bytes}]
 
         result = service.find_best_match(question, cached_questions)
 
@@ -146,6 +148,23 @@ class TestFindBestMatch:
         assert result is not None
         assert result["id"] == 1
 
+    def test_scores_vectors_of_different_lengths(self):
+        service = SimilarityService(threshold=0.5)
+        query = np.array([1.0, 0.0, 0.0], VECTOR_DTYPE).tobytes()
+
+        cached_questions = [
+            {"id": 1, "tfidf_vector": np.array([0.0, 1.0], VECTOR_DTYPE).tobytes()},
+            {"id": 2, "tfidf_vector": np.array([1.0], VECTOR_DTYPE).tobytes()},
+            {"id": 3, "tfidf_vector": np.array([1.0, 0.0, 0.0, 0.0], VECTOR_DTYPE).tobytes()},
+        ]
+
+        with patch.object(service, "vectorize", return_value=query):
+            result = service.find_best_match("q", cached_questions)
+
+        assert result is not None
+        assert result["id"] == 2
+        assert result["similarity_score"] == pytest.approx(1.0)
+
 
 class TestFitOnCorpus:
 
@@ -163,3 +182,10 @@ class TestFitOnCorpus:
         service.fit_on_corpus([])
 
         assert service._is_fitted is False
+
+    def test_fit_on_single_question_does_nothing(self):
+        service = SimilarityService()
+
+        service.fit_on_corpus(["What is Python?"])
+
+        assert service._is_fitted is False
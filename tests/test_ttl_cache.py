@@ -0,0 +1,51 @@
+from repositories import ttl_cache
+from repositories.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_returns_stored_value(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert "a" in cache
+
+    def test_missing_key_returns_default(self):
+        cache = TTLCache()
+
+        assert cache.get("missing") is None
+        assert cache.get("missing", 0) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_expired_entries_are_dropped(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+
+        now[0] += 11
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_pop_and_clear(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.pop("a")
+        cache.pop("missing")
+        assert "a" not in cache
+
+        cache.clear()
+        assert len(cache) == 0